@@ -1,7 +1,7 @@
 import redis
 import json
 import os
-from typing import Optional, List
+from typing import Optional, List, Tuple, Dict
 from models import Book
 
 class CacheService:
@@ -32,6 +32,29 @@ class CacheService:
             print(f"Cache set error: {e}")
             return False
     
+    def get_books(self, book_ids: List[str]) -> List[Optional[dict]]:
+        """Get many books from cache in one MGET, None for misses"""
+        if not book_ids:
+            return []
+        try:
+            cached_data = self.redis_client.mget([f"book:{book_id}" for book_id in book_ids])
+            return [json.loads(data) if data else None for data in cached_data]
+        except Exception as e:
+            print(f"Cache mget error: {e}")
+            return [None] * len(book_ids)
+    
+    def set_books(self, books_data: Dict[str, dict]) -> bool:
+        """Set many books in cache in one round trip"""
+        try:
+            pipeline = self.redis_client.pipeline(transaction=False)
+            for book_id, book_data in books_data.items():
+                pipeline.setex(f"book:{book_id}", self.default_ttl, json.dumps(book_data, default=str))
+            pipeline.execute()
+            return True
+        except Exception as e:
+            print(f"Cache set many error: {e}")
+            return False
+    
     def delete_book(self, book_id: str) -> bool:
         """Delete book from cache"""
         try:
@@ -42,11 +65,13 @@ class CacheService:
             print(f"Cache delete error: {e}")
             return False
     
-    def get_books_list(self) -> Optional[List[dict]]:
-        """Get books list from cache"""
+    def get_books_list(self, fields: Optional[Tuple[str, ...]] = None) -> Optional[List[dict]]:
+        """Get books list from cache; sparse fieldsets live in a hash next to the full list"""
         try:
-            key = "books:all"
-            cached_data = self.redis_client.get(key)
+            if fields is None:
+                cached_data = self.redis_client.get("books:all")
+            else:
+                cached_data = self.redis_client.hget("books:fields", ",".join(fields))
             if cached_data:
                 return json.loads(cached_data)
             return None
@@ -54,11 +79,17 @@ class CacheService:
             print(f"Cache get list error: {e}")
             return None
     
-    def set_books_list(self, books_data: List[dict]) -> bool:
+    def set_books_list(self, books_data: List[dict], fields: Optional[Tuple[str, ...]] = None) -> bool:
         """Set books list in cache"""
         try:
-            key = "books:all"
-            self.redis_client.setex(key, self.default_ttl, json.dumps(books_data, default=str))
+            payload = json.dumps(books_data, default=str)
+            if fields is None:
+                self.redis_client.setex("books:all", self.default_ttl, payload)
+            else:
+                pipeline = self.redis_client.pipeline()
+                pipeline.hset("books:fields", ",".join(fields), payload)
+                pipeline.expire("books:fields", self.default_ttl)
+                pipeline.execute()
             return True
         except Exception as e:
             print(f"Cache set list error: {e}")
@@ -67,7 +98,7 @@ class CacheService:
     def invalidate_books_list(self) -> bool:
         """Invalidate books list cache"""
         try:
-            self.redis_client.delete("books:all")
+            self.redis_client.delete("books:all", "books:fields")
             return True
         except Exception as e:
             print(f"Cache invalidate error: {e}")
@@ -0,0 +1,31 @@
+from typing import Optional, Tuple
+
+from sqlalchemy.orm import Query
+
+from database import BookDB
+
+# Book fields a client can ask for with ?fields=; id is always returned
+FIELDS = ('id', 'title', 'description', 'author', 'created_at', 'updated_at')
+
+class InvalidFields(ValueError):
+    pass
+
+def parse_fields(fields: Optional[str]) -> Optional[Tuple[str, ...]]:
+    """Requested fields in canonical order, or None for full rows"""
+    if not fields:
+        return None
+    
+    requested = {field.strip() for field in fields.split(',') if field.strip()}
+    unknown = requested - set(FIELDS)
+    if unknown:
+        raise InvalidFields(f"Unknown fields: {', '.join(sorted(unknown))}; available: {', '.join(FIELDS)}")
+    
+    requested.add('id')
+    selected = tuple(field for field in FIELDS if field in requested)
+    return None if selected == FIELDS else selected
+
+def select_columns(query: Query, fields: Optional[Tuple[str, ...]]) -> Query:
+    """Narrow a book query's SELECT to the requested fields"""
+    if fields is None:
+        return query
+    return query.with_entities(*(getattr(BookDB, field) for field in fields))
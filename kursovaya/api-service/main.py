@@ -1,16 +1,21 @@
-from fastapi import FastAPI, HTTPException, Depends, status
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, Depends, Query, status
+from fastapi.responses import Response, JSONResponse
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
+from sqlalchemy import any_, cast
+from sqlalchemy.dialects.postgresql import ARRAY
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
 from prometheus_fastapi_instrumentator import Instrumentator
+import os
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
-from models import Book, BookCreate, BookUpdate, BookResponse
+from models import Book, BookCreate, BookUpdate, BookResponse, BookBatchGetRequest, BookBatchGetResult
 from database import get_db, BookDB
 from cache_service import CacheService
 from message_broker import MessageBroker
+from fieldsets import parse_fields, select_columns, InvalidFields
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -42,6 +47,9 @@ async def add_utf8_header(request, call_next):
         response.headers["content-type"] = "application/json; charset=utf-8"
     return response
 
+# Largest number of ids accepted by POST /books/batch-get
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", "500"))
+
 # Initialize services
 cache_service = CacheService()
 message_broker = MessageBroker()
@@ -78,6 +86,19 @@ active_books_count = Gauge(
 instrumentator = Instrumentator()
 instrumentator.instrument(app).expose(app)
 
+def requested_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,author")
+) -> Optional[Tuple[str, ...]]:
+    """Sparse fieldset of a list request"""
+    try:
+        return parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def load_sparse_books(query, fields: Tuple[str, ...]) -> List[dict]:
+    """Only the requested columns, JSON-ready (no per-row response models)"""
+    return jsonable_encoder([row._asdict() for row in select_columns(query, fields)])
+
 @app.get("/metrics", response_class=Response)
 def get_metrics():
     """Prometheus metrics endpoint"""
@@ -127,18 +148,29 @@ def create_book(book: BookCreate, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to create book: {str(e)}")
 
 @app.get("/books", response_model=List[BookResponse])
-def get_books(db: Session = Depends(get_db)):
+def get_books(fields: Optional[Tuple[str, ...]] = Depends(requested_fields), db: Session = Depends(get_db)):
     """Получить все книги"""
     try:
         # Try cache first
-        cached_books = cache_service.get_books_list()
+        cached_books = cache_service.get_books_list(fields)
         if cached_books:
             books_cache_hits_total.inc()
             books_operations_total.labels(operation='list', status='success').inc()
+            if fields is not None:
+                return JSONResponse(content=cached_books)
             return [BookResponse(**book) for book in cached_books]
         
         # Cache miss - get from database
         books_cache_misses_total.inc()
+        
+        if fields is not None:
+            # Only the requested columns are read, cached and sent
+            books_list = load_sparse_books(db.query(BookDB), fields)
+            cache_service.set_books_list(books_list, fields)
+            books_operations_total.labels(operation='list', status='success').inc()
+            active_books_count.set(len(books_list))
+            return JSONResponse(content=books_list)
+        
         books = db.query(BookDB).all()
         
         # Convert to dict list
@@ -167,6 +199,63 @@ def get_books(db: Session = Depends(get_db)):
         books_operations_total.labels(operation='list', status='error').inc()
         raise HTTPException(status_code=500, detail=f"Failed to get books: {str(e)}")
 
+@app.post("/books/batch-get", response_model=List[BookBatchGetResult])
+def batch_get_books(request: BookBatchGetRequest, db: Session = Depends(get_db)):
+    """Получить несколько книг по ID"""
+    if len(request.ids) > BATCH_GET_MAX_IDS:
+        books_operations_total.labels(operation='batch_get', status='error').inc()
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_GET_MAX_IDS} ids per request")
+    
+    try:
+        ids = list(dict.fromkeys(str(book_id) for book_id in request.ids))
+        
+        # Try cache first: one MGET for all ids
+        books = {
+            book_id: cached_book
+            for book_id, cached_book in zip(ids, cache_service.get_books(ids))
+            if cached_book
+        }
+        misses = [book_id for book_id in ids if book_id not in books]
+        books_cache_hits_total.inc(len(books))
+        books_cache_misses_total.inc(len(misses))
+        
+        if misses:
+            # One query with a single array parameter for all misses
+            rows = db.query(BookDB).filter(
+                BookDB.id == any_(cast([uuid.UUID(book_id) for book_id in misses], ARRAY(BookDB.id.type)))
+            ).all()
+            
+            loaded = {}
+            for book in rows:
+                loaded[str(book.id)] = {
+                    "id": str(book.id),
+                    "title": book.title,
+                    "description": book.description,
+                    "author": book.author,
+                    "created_at": book.created_at,
+                    "updated_at": book.updated_at
+                }
+            
+            # Backfill the cache in one pipelined round trip
+            if loaded:
+                cache_service.set_books(loaded)
+            books.update(loaded)
+        
+        books_operations_total.labels(operation='batch_get', status='success').inc()
+        
+        return [
+            BookBatchGetResult(
+                id=book_id,
+                found=str(book_id) in books,
+                book=BookResponse(**books[str(book_id)]) if str(book_id) in books else None
+            )
+            for book_id in request.ids
+        ]
+    
+    except Exception as e:
+        books_operations_total.labels(operation='batch_get', status='error').inc()
+        raise HTTPException(status_code=500, detail=f"Failed to get books: {str(e)}")
+
 @app.get("/books/{book_id}", response_model=BookResponse)
 def get_book(book_id: str, db: Session = Depends(get_db)):
     """Получить книгу по ID"""
@@ -217,10 +306,20 @@ def get_book(book_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Failed to get book: {str(e)}")
 
 @app.get("/books/search/{title}", response_model=List[BookResponse])
-def search_books_by_title(title: str, db: Session = Depends(get_db)):
+def search_books_by_title(
+    title: str,
+    fields: Optional[Tuple[str, ...]] = Depends(requested_fields),
+    db: Session = Depends(get_db)
+):
     """Поиск книг по названию"""
     try:
-        books = db.query(BookDB).filter(BookDB.title.ilike(f"%{title}%")).all()
+        query = db.query(BookDB).filter(BookDB.title.ilike(f"%{title}%"))
+        if fields is not None:
+            books_list = load_sparse_books(query, fields)
+            books_operations_total.labels(operation='search', status='success').inc()
+            return JSONResponse(content=books_list)
+        
+        books = query.all()
         
         books_list = []
         for book in books:
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import uuid
 from datetime import datetime
 
@@ -31,3 +31,11 @@ class BookResponse(BaseModel):
     author: str
     created_at: datetime
     updated_at: datetime
+
+class BookBatchGetRequest(BaseModel):
+    ids: List[uuid.UUID]
+
+class BookBatchGetResult(BaseModel):
+    id: uuid.UUID
+    found: bool
+    book: Optional[BookResponse] = None
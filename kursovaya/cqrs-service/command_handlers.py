@@ -1,22 +1,137 @@
-from typing import List
+from typing import List, Optional, Union
 import uuid
 from datetime import datetime
 
 from models import (
     CreateBookCommand, UpdateBookCommand, DeleteBookCommand,
-    Event, EventType, BookAggregate
+    Event, EventType, BookAggregate, AggregateHeader
 )
-from event_store import AggregateRepository
+from event_store import AggregateRepository, ConcurrencyError
 
 class CommandHandler:
     def __init__(self, repository: AggregateRepository):
         self.repository = repository
     
+    def handle(self, command: Union[CreateBookCommand, UpdateBookCommand, DeleteBookCommand]) -> List[Event]:
+        """Dispatch command to its handler"""
+        if isinstance(command, CreateBookCommand):
+            return self.handle_create_book(command)
+        if isinstance(command, UpdateBookCommand):
+            return self.handle_update_book(command)
+        if isinstance(command, DeleteBookCommand):
+            return self.handle_delete_book(command)
+        raise ValueError(f"Unknown command type: {command.command_type}")
+    
+    def handle_commands(self, commands: List[Union[CreateBookCommand, UpdateBookCommand, DeleteBookCommand]]
+                        ) -> List[Union[List[Event], ValueError]]:
+        """Validate a batch of commands against aggregate headers loaded in one query"""
+        event_store = self.repository.event_store
+        existence_filter = event_store.existence_filter
+        
+        # Ids the existence filter rules out are known to be new and need no lookup
+        aggregate_ids = {
+            command.aggregate_id for command in commands
+            if not isinstance(command, CreateBookCommand)
+            or existence_filter is None or existence_filter.might_exist(command.aggregate_id)
+        }
+        headers = event_store.get_aggregate_headers(aggregate_ids)
+        
+        # Commands are applied in order, so later ones in the batch see earlier results
+        outcomes = []
+        for command in commands:
+            header = headers.get(command.aggregate_id)
+            try:
+                if isinstance(command, CreateBookCommand):
+                    events = self._create_book_events(command, header)
+                elif isinstance(command, UpdateBookCommand):
+                    events = self._update_book_events(command, self._require_live(command.aggregate_id, header))
+                elif isinstance(command, DeleteBookCommand):
+                    events = self._delete_book_events(command, self._require_live(command.aggregate_id, header))
+                else:
+                    raise ValueError(f"Unknown command type: {command.command_type}")
+            except ValueError as e:
+                outcomes.append(e)
+                continue
+            
+            headers[command.aggregate_id] = AggregateHeader(
+                aggregate_id=command.aggregate_id,
+                version=events[-1].event_version,
+                is_deleted=events[-1].event_type == EventType.BOOK_DELETED
+            )
+            outcomes.append(events)
+        
+        return outcomes
+    
+    def process_commands(self, commands: List[Union[CreateBookCommand, UpdateBookCommand, DeleteBookCommand]]
+                         ) -> List[Union[List[Event], ValueError]]:
+        """Validate commands and append all their events, in a single transaction when possible"""
+        outcomes = self.handle_commands(commands)
+        try:
+            self.repository.event_store.append_event_batch(self._collect_events(outcomes))
+            return outcomes
+        except ConcurrencyError:
+            pass
+        
+        # Some book was modified concurrently; retry per aggregate so only that book fails
+        groups = {}
+        for index, command in enumerate(commands):
+            groups.setdefault(command.aggregate_id, []).append(index)
+        
+        outcomes = [None] * len(commands)
+        for indexes in groups.values():
+            group_outcomes = self.handle_commands([commands[index] for index in indexes])
+            try:
+                self.repository.event_store.append_event_batch(self._collect_events(group_outcomes))
+            except ConcurrencyError as e:
+                group_outcomes = [e if isinstance(outcome, list) else outcome for outcome in group_outcomes]
+            for index, outcome in zip(indexes, group_outcomes):
+                outcomes[index] = outcome
+        
+        return outcomes
+    
+    def _collect_events(self, outcomes: List[Union[List[Event], ValueError]]) -> List[Event]:
+        """Events of all successfully validated commands"""
+        return [event for outcome in outcomes if isinstance(outcome, list) for event in outcome]
+    
     def handle_create_book(self, command: CreateBookCommand) -> List[Event]:
         """Handle create book command"""
-        # Check if book already exists
-        existing_aggregate = self.repository.get_by_id(command.aggregate_id)
-        if existing_aggregate:
+        # Check if book already exists; a definite miss in the existence filter skips
+        # the database, false positives fall through to the header lookup and the
+        # unique (aggregate_id, event_version) constraint stays the final arbiter on append
+        event_store = self.repository.event_store
+        existence_filter = event_store.existence_filter
+        header = None
+        if existence_filter is None or existence_filter.might_exist(command.aggregate_id):
+            header = event_store.get_aggregate_header(command.aggregate_id)
+        
+        return self._create_book_events(command, header)
+    
+    def handle_update_book(self, command: UpdateBookCommand) -> List[Event]:
+        """Handle update book command"""
+        # Only the version is needed; concurrent writers are rejected on append
+        header = self._get_live_header(command.aggregate_id)
+        return self._update_book_events(command, header)
+    
+    def handle_delete_book(self, command: DeleteBookCommand) -> List[Event]:
+        """Handle delete book command"""
+        # Only the version is needed; concurrent writers are rejected on append
+        header = self._get_live_header(command.aggregate_id)
+        return self._delete_book_events(command, header)
+    
+    def _get_live_header(self, aggregate_id: uuid.UUID) -> AggregateHeader:
+        """Get version header of an existing, not deleted book"""
+        header = self.repository.event_store.get_aggregate_header(aggregate_id)
+        return self._require_live(aggregate_id, header)
+    
+    def _require_live(self, aggregate_id: uuid.UUID, header: Optional[AggregateHeader]) -> AggregateHeader:
+        """Reject commands on missing or deleted books"""
+        if not header or header.is_deleted:
+            raise ValueError(f"Book with ID {aggregate_id} not found")
+        return header
+    
+    def _create_book_events(self, command: CreateBookCommand, header: Optional[AggregateHeader]) -> List[Event]:
+        """Build events for create book command"""
+        if header:
             raise ValueError(f"Book with ID {command.aggregate_id} already exists")
         
         # Create event
@@ -36,13 +151,8 @@ class CommandHandler:
         
         return [event]
     
-    def handle_update_book(self, command: UpdateBookCommand) -> List[Event]:
-        """Handle update book command"""
-        # Get existing aggregate
-        aggregate = self.repository.get_by_id(command.aggregate_id)
-        if not aggregate:
-            raise ValueError(f"Book with ID {command.aggregate_id} not found")
-        
+    def _update_book_events(self, command: UpdateBookCommand, header: AggregateHeader) -> List[Event]:
+        """Build events for update book command"""
         # Prepare update data
         update_data = {}
         if command.title is not None:
@@ -64,18 +174,13 @@ class CommandHandler:
             aggregate_type="Book",
             event_type=EventType.BOOK_UPDATED,
             event_data=update_data,
-            event_version=aggregate.version + 1
+            event_version=header.version + 1
         )
         
         return [event]
     
-    def handle_delete_book(self, command: DeleteBookCommand) -> List[Event]:
-        """Handle delete book command"""
-        # Get existing aggregate
-        aggregate = self.repository.get_by_id(command.aggregate_id)
-        if not aggregate:
-            raise ValueError(f"Book with ID {command.aggregate_id} not found")
-        
+    def _delete_book_events(self, command: DeleteBookCommand, header: AggregateHeader) -> List[Event]:
+        """Build events for delete book command"""
         # Create event
         now = datetime.utcnow()
         event = Event(
@@ -85,7 +190,7 @@ class CommandHandler:
             event_data={
                 "deleted_at": now.isoformat()
             },
-            event_version=aggregate.version + 1
+            event_version=header.version + 1
         )
         
         return [event]
@@ -26,6 +26,15 @@ class EventStoreDB(Base):
         UniqueConstraint('aggregate_id', 'event_version', name='uq_aggregate_version'),
     )
 
+class AggregateSnapshotDB(Base):
+    __tablename__ = "aggregate_snapshots"
+    
+    aggregate_id = Column(UUID(as_uuid=True), primary_key=True)
+    version = Column(Integer, primary_key=True)
+    aggregate_type = Column(String(100), nullable=False)
+    state = Column(JSON, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
 def get_db():
     db = SessionLocal()
     try:
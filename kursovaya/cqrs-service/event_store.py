@@ -1,38 +1,148 @@
+from sqlalchemy import insert, select, func
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from prometheus_client import Counter, Histogram
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import os
 import uuid
 from datetime import datetime
 
-from database import EventStoreDB
-from models import Event, BookAggregate, EventType
+from database import SessionLocal, EventStoreDB, AggregateSnapshotDB
+from existence_filter import AggregateExistenceFilter
+from models import Event, BookAggregate, AggregateHeader, EventType
+
+# Rows fetched per round trip when streaming the event store through a server-side cursor
+STREAM_BATCH_SIZE = int(os.getenv("EVENT_STREAM_BATCH_SIZE", "1000"))
+
+# Change feed: appends NOTIFY listeners with the new global position (event_store.id)
+EVENT_STORE_NOTIFY = os.getenv("EVENT_STORE_NOTIFY", "false").lower() == "true"
+EVENT_STORE_NOTIFY_CHANNEL = os.getenv("EVENT_STORE_NOTIFY_CHANNEL", "event_store_changes")
+
+# With ordered appends, writers hold this transaction-level advisory lock so positions become visible
+# in commit order and readers tailing event_store by id never skip a row that commits late. Positions
+# are published with every event (broker metadata and NOTIFY) and the projector catches up to them by
+# id, so the lock is on by default; disable it only when no consumer reads event_store by position
+EVENT_STORE_ORDERED_APPENDS = os.getenv("EVENT_STORE_ORDERED_APPENDS", "true").lower() == "true"
+APPEND_LOCK_KEY = 7318001
+
+# Take a snapshot once this many events have been replayed on top of the last one (0 disables)
+SNAPSHOT_EVERY_N_EVENTS = int(os.getenv("SNAPSHOT_EVERY_N_EVENTS", "50"))
+
+# Prometheus metrics
+snapshot_lookups_total = Counter(
+    'aggregate_snapshot_lookups_total',
+    'Total number of snapshot lookups during aggregate rehydration',
+    ['result']
+)
+
+snapshots_saved_total = Counter(
+    'aggregate_snapshots_saved_total',
+    'Total number of aggregate snapshots written'
+)
+
+aggregate_replay_length = Histogram(
+    'aggregate_replay_events',
+    'Number of events replayed to rehydrate an aggregate',
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+)
+
+class ConcurrencyError(ValueError):
+    """Raised when appended events conflict with the versions already in the stream"""
+    pass
 
 class EventStore:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, existence_filter: Optional[AggregateExistenceFilter] = None):
         self.db = db
+        self.existence_filter = existence_filter
     
     def save_event(self, event: Event) -> Event:
         """Save event to event store"""
-        db_event = EventStoreDB(
-            aggregate_id=event.aggregate_id,
-            aggregate_type=event.aggregate_type,
-            event_type=event.event_type,
-            event_data=event.event_data,
-            event_version=event.event_version
+        return self.append_events(event.aggregate_id, event.event_version - 1, [event])[0]
+    
+    def append_events(self, aggregate_id: uuid.UUID, expected_version: int, events: List[Event]) -> List[Event]:
+        """Append events to one aggregate in a single transaction, rejecting the whole batch on a version conflict"""
+        return self.append_streams([(aggregate_id, expected_version, events)])
+    
+    def append_event_batch(self, events: List[Event]) -> List[Event]:
+        """Append events of several aggregates in one transaction; each stream continues from its first event"""
+        streams = {}
+        for event in events:
+            if event.aggregate_id not in streams:
+                streams[event.aggregate_id] = (event.aggregate_id, event.event_version - 1, [])
+            streams[event.aggregate_id][2].append(event)
+        
+        self.append_streams(list(streams.values()))
+        return events
+    
+    def append_streams(self, streams: List[Tuple[uuid.UUID, int, List[Event]]]) -> List[Event]:
+        """Append (aggregate_id, expected_version, events) streams in a single transaction"""
+        # Events must continue each stream right after its expected_version
+        rows = []
+        appended = []
+        for aggregate_id, expected_version, events in streams:
+            for offset, event in enumerate(events, start=1):
+                if event.aggregate_id != aggregate_id:
+                    raise ValueError(f"Event for aggregate {event.aggregate_id} cannot be appended to {aggregate_id}")
+                if event.event_version != expected_version + offset:
+                    raise ValueError(
+                        f"Event version {event.event_version} does not follow expected version {expected_version + offset - 1}"
+                    )
+                rows.append({
+                    "aggregate_id": event.aggregate_id,
+                    "aggregate_type": event.aggregate_type,
+                    "event_type": event.event_type,
+                    "event_data": event.event_data,
+                    "event_version": event.event_version
+                })
+                appended.append(event)
+        
+        if not rows:
+            return []
+        
+        statement = insert(EventStoreDB).values(rows).returning(
+            EventStoreDB.id, EventStoreDB.aggregate_id, EventStoreDB.event_version, EventStoreDB.occurred_at
         )
         
-        self.db.add(db_event)
-        self.db.commit()
-        self.db.refresh(db_event)
+        # Single multi-row INSERT ... RETURNING; the unique (aggregate_id, event_version)
+        # constraint turns a concurrent writer into an IntegrityError for the whole batch
+        try:
+            if EVENT_STORE_ORDERED_APPENDS:
+                self.db.execute(select(func.pg_advisory_xact_lock(APPEND_LOCK_KEY)))
+            stored = {(row.aggregate_id, row.event_version): row for row in self.db.execute(statement)}
+            if EVENT_STORE_NOTIFY:
+                # Delivered to listeners only when the transaction commits
+                position = max(row.id for row in stored.values())
+                self.db.execute(select(func.pg_notify(EVENT_STORE_NOTIFY_CHANNEL, str(position))))
+            self.db.commit()
+        except IntegrityError:
+            self.db.rollback()
+            conflicting = ", ".join(f"{aggregate_id} (expected version {expected_version})"
+                                    for aggregate_id, expected_version, _ in streams)
+            raise ConcurrencyError(f"Aggregate modified concurrently: {conflicting}")
+        except Exception:
+            self.db.rollback()
+            raise
+        
+        for event in appended:
+            row = stored[(event.aggregate_id, event.event_version)]
+            event.id = row.id
+            event.occurred_at = row.occurred_at
         
-        event.id = db_event.id
-        event.occurred_at = db_event.occurred_at
-        return event
+        if self.existence_filter is not None:
+            for aggregate_id, expected_version, events in streams:
+                if expected_version == 0 and events:
+                    self.existence_filter.add(aggregate_id)
+        
+        return appended
     
-    def get_events_by_aggregate_id(self, aggregate_id: uuid.UUID) -> List[Event]:
-        """Get all events for an aggregate"""
-        events = self.db.query(EventStoreDB).filter(
-            EventStoreDB.aggregate_id == aggregate_id
-        ).order_by(EventStoreDB.event_version).all()
+    def get_events_by_aggregate_id(self, aggregate_id: uuid.UUID, after_version: int = 0) -> List[Event]:
+        """Get events for an aggregate, optionally only those after a given version"""
+        query = self.db.query(EventStoreDB).filter(EventStoreDB.aggregate_id == aggregate_id)
+        if after_version:
+            query = query.filter(EventStoreDB.event_version > after_version)
+        
+        events = query.order_by(EventStoreDB.event_version).all()
         
         return [
             Event(
@@ -47,13 +157,51 @@ class EventStore:
             for event in events
         ]
     
-    def get_latest_version(self, aggregate_id: uuid.UUID) -> int:
-        """Get latest version for aggregate"""
-        latest = self.db.query(EventStoreDB).filter(
+    def get_aggregate_header(self, aggregate_id: uuid.UUID) -> Optional[AggregateHeader]:
+        """Get latest version and deleted flag of an aggregate without replaying it"""
+        # Served by the (aggregate_id, event_version) unique index; deletion is terminal,
+        # so the type of the newest event tells whether the aggregate is deleted
+        latest = self.db.query(EventStoreDB.event_version, EventStoreDB.event_type).filter(
             EventStoreDB.aggregate_id == aggregate_id
-        ).order_by(EventStoreDB.event_version.desc()).first()
+        ).order_by(EventStoreDB.event_version.desc()).limit(1).first()
+        
+        if not latest:
+            return None
+        
+        return AggregateHeader(
+            aggregate_id=aggregate_id,
+            version=latest.event_version,
+            is_deleted=latest.event_type == EventType.BOOK_DELETED
+        )
+    
+    def get_aggregate_headers(self, aggregate_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, AggregateHeader]:
+        """Get headers of many aggregates in one query"""
+        aggregate_ids = list(aggregate_ids)
+        if not aggregate_ids:
+            return {}
+        
+        # DISTINCT ON keeps the newest event of every requested aggregate
+        latest_events = self.db.query(
+            EventStoreDB.aggregate_id, EventStoreDB.event_version, EventStoreDB.event_type
+        ).filter(
+            EventStoreDB.aggregate_id.in_(aggregate_ids)
+        ).distinct(EventStoreDB.aggregate_id).order_by(
+            EventStoreDB.aggregate_id, EventStoreDB.event_version.desc()
+        ).all()
         
-        return latest.event_version if latest else 0
+        return {
+            latest.aggregate_id: AggregateHeader(
+                aggregate_id=latest.aggregate_id,
+                version=latest.event_version,
+                is_deleted=latest.event_type == EventType.BOOK_DELETED
+            )
+            for latest in latest_events
+        }
+    
+    def get_latest_version(self, aggregate_id: uuid.UUID) -> int:
+        """Get latest version for aggregate"""
+        header = self.get_aggregate_header(aggregate_id)
+        return header.version if header else 0
     
     def get_all_events(self, event_type: Optional[str] = None) -> List[Event]:
         """Get all events, optionally filtered by type"""
@@ -76,40 +224,137 @@ class EventStore:
             for event in events
         ]
 
+    def get_events_after(self, after: int = 0, limit: int = 100, event_type: Optional[str] = None) -> List[Event]:
+        """Get a page of the global event feed ordered by position (id)"""
+        query = self.db.query(EventStoreDB).filter(EventStoreDB.id > after)
+        if event_type:
+            query = query.filter(EventStoreDB.event_type == event_type)
+        
+        events = query.order_by(EventStoreDB.id).limit(limit).all()
+        
+        return [self._to_event(event) for event in events]
+    
+    def stream_events_after(self, after: int = 0, event_type: Optional[str] = None,
+                            batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Event]:
+        """Stream the global event feed from a position through a server-side cursor"""
+        query = self.db.query(EventStoreDB).filter(EventStoreDB.id > after)
+        if event_type:
+            query = query.filter(EventStoreDB.event_type == event_type)
+        
+        for event in query.order_by(EventStoreDB.id).execution_options(yield_per=batch_size):
+            yield self._to_event(event)
+    
+    def _to_event(self, event: EventStoreDB) -> Event:
+        """Convert stored row to event model"""
+        return Event(
+            id=event.id,
+            aggregate_id=event.aggregate_id,
+            aggregate_type=event.aggregate_type,
+            event_type=event.event_type,
+            event_data=event.event_data,
+            event_version=event.event_version,
+            occurred_at=event.occurred_at
+        )
+    
+    def stream_events_by_aggregate(self, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Event]:
+        """Stream all events ordered by (aggregate_id, event_version) through a server-side cursor"""
+        query = self.db.query(EventStoreDB).order_by(
+            EventStoreDB.aggregate_id, EventStoreDB.event_version
+        ).execution_options(yield_per=batch_size)
+        
+        for event in query:
+            yield self._to_event(event)
+
+class SnapshotStore:
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def get_latest_snapshot(self, aggregate_id: uuid.UUID) -> Optional[BookAggregate]:
+        """Load the most recent snapshot of an aggregate"""
+        snapshot = self.db.query(AggregateSnapshotDB).filter(
+            AggregateSnapshotDB.aggregate_id == aggregate_id
+        ).order_by(AggregateSnapshotDB.version.desc()).first()
+        
+        if not snapshot:
+            return None
+        
+        return BookAggregate(**snapshot.state)
+    
+    def save_snapshot(self, aggregate: BookAggregate) -> None:
+        """Store aggregate state at its current version in a session of its own, so a failed write
+        never touches the caller's transaction"""
+        statement = pg_insert(AggregateSnapshotDB).values(
+            aggregate_id=aggregate.id,
+            version=aggregate.version,
+            aggregate_type="Book",
+            state=aggregate.model_dump(mode="json")
+        ).on_conflict_do_nothing(index_elements=['aggregate_id', 'version'])
+        
+        with SessionLocal() as db:
+            try:
+                db.execute(statement)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+
 class AggregateRepository:
-    def __init__(self, event_store: EventStore):
+    def __init__(self, event_store: EventStore, snapshot_store: Optional[SnapshotStore] = None,
+                 snapshot_every: int = SNAPSHOT_EVERY_N_EVENTS):
         self.event_store = event_store
+        self.snapshot_store = snapshot_store or SnapshotStore(event_store.db)
+        self.snapshot_every = snapshot_every
     
     def save(self, aggregate: BookAggregate, events: List[Event]) -> BookAggregate:
-        """Save aggregate by saving its events"""
-        for event in events:
-            self.event_store.save_event(event)
+        """Save aggregate by appending its events in one transaction"""
+        if events:
+            self.event_store.append_events(aggregate.id, events[0].event_version - 1, events)
         return aggregate
     
     def get_by_id(self, aggregate_id: uuid.UUID) -> Optional[BookAggregate]:
-        """Reconstruct aggregate from events"""
-        events = self.event_store.get_events_by_aggregate_id(aggregate_id)
+        """Reconstruct aggregate from the latest snapshot plus the events after it"""
+        aggregate = None
+        if self.snapshot_every > 0:
+            aggregate = self.snapshot_store.get_latest_snapshot(aggregate_id)
+            snapshot_lookups_total.labels(result='hit' if aggregate else 'miss').inc()
         
-        if not events:
-            return None
+        snapshot_version = aggregate.version if aggregate else 0
+        events = self.event_store.get_events_by_aggregate_id(aggregate_id, after_version=snapshot_version)
+        aggregate_replay_length.observe(len(events))
         
-        aggregate = BookAggregate(id=aggregate_id)
+        if aggregate is None:
+            if not events:
+                return None
+            aggregate = BookAggregate(id=aggregate_id)
         
         for event in events:
             aggregate.apply_event(event)
         
+        # Snapshot once the replayed tail gets long enough
+        if self.snapshot_every > 0 and len(events) >= self.snapshot_every:
+            try:
+                self.snapshot_store.save_snapshot(aggregate)
+                snapshots_saved_total.inc()
+            except Exception as e:
+                print(f"Failed to save snapshot for {aggregate_id}: {e}")
+        
         return aggregate if not aggregate.is_deleted else None
     
-    def get_all_aggregates(self) -> List[BookAggregate]:
-        """Get all book aggregates"""
-        # Get all unique aggregate IDs
-        all_events = self.event_store.get_all_events()
-        aggregate_ids = set(event.aggregate_id for event in all_events)
+    def iter_all_aggregates(self) -> Iterator[BookAggregate]:
+        """Rebuild all live aggregates in a single streaming pass over the event store"""
+        aggregate = None
         
-        aggregates = []
-        for aggregate_id in aggregate_ids:
-            aggregate = self.get_by_id(aggregate_id)
-            if aggregate and not aggregate.is_deleted:
-                aggregates.append(aggregate)
+        for event in self.event_store.stream_events_by_aggregate():
+            if aggregate is None or aggregate.id != event.aggregate_id:
+                if aggregate is not None and not aggregate.is_deleted:
+                    yield aggregate
+                aggregate = BookAggregate(id=event.aggregate_id)
+            
+            aggregate.apply_event(event)
         
-        return aggregates
+        if aggregate is not None and not aggregate.is_deleted:
+            yield aggregate
+    
+    def get_all_aggregates(self) -> List[BookAggregate]:
+        """Get all book aggregates"""
+        return list(self.iter_all_aggregates())
@@ -0,0 +1,87 @@
+import hashlib
+import math
+import os
+import threading
+import uuid
+
+from sqlalchemy.orm import Session
+from prometheus_client import Counter, Gauge
+
+from database import EventStoreDB
+
+EXISTENCE_FILTER_CAPACITY = int(os.getenv("EXISTENCE_FILTER_CAPACITY", "1000000"))
+EXISTENCE_FILTER_ERROR_RATE = float(os.getenv("EXISTENCE_FILTER_ERROR_RATE", "0.01"))
+
+# Prometheus metrics
+existence_filter_checks_total = Counter(
+    'existence_filter_checks_total',
+    'Total number of aggregate existence filter checks',
+    ['result']
+)
+
+existence_filter_items = Gauge(
+    'existence_filter_items',
+    'Number of aggregate ids added to the existence filter'
+)
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+    
+    def _positions(self, key: bytes):
+        """Bit positions of a key (double hashing over one blake2b digest)"""
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+    
+    def add(self, key: bytes):
+        """Add key to the filter"""
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+    
+    def might_contain(self, key: bytes) -> bool:
+        """False means the key was definitely never added"""
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+class AggregateExistenceFilter:
+    """Probabilistic set of aggregate ids present in the event store"""
+    
+    def __init__(self, capacity: int = EXISTENCE_FILTER_CAPACITY, error_rate: float = EXISTENCE_FILTER_ERROR_RATE):
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.lock = threading.Lock()
+        self.ready = False
+        self.count = 0
+    
+    def add(self, aggregate_id: uuid.UUID):
+        """Record an aggregate id that now has events"""
+        with self.lock:
+            self.bloom.add(aggregate_id.bytes)
+            self.count += 1
+        existence_filter_items.set(self.count)
+    
+    def might_exist(self, aggregate_id: uuid.UUID) -> bool:
+        """Check aggregate id; only a False answer is definitive"""
+        if not self.ready:
+            existence_filter_checks_total.labels(result='not_ready').inc()
+            return True
+        
+        with self.lock:
+            present = self.bloom.might_contain(aggregate_id.bytes)
+        
+        existence_filter_checks_total.labels(result='maybe_present' if present else 'definite_miss').inc()
+        return present
+    
+    def warm(self, db: Session, batch_size: int = 10000):
+        """Load all aggregate ids from the event store"""
+        query = db.query(EventStoreDB.aggregate_id).filter(
+            EventStoreDB.event_version == 1
+        ).execution_options(yield_per=batch_size)
+        
+        for (aggregate_id,) in query:
+            self.add(aggregate_id)
+        
+        self.ready = True
+        print(f"Existence filter warmed with {self.count} aggregate ids")
@@ -1,21 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends, status
-from fastapi.responses import Response
+from fastapi import FastAPI, HTTPException, Depends, Query, status
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
 from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
 from prometheus_fastapi_instrumentator import Instrumentator
 import uuid
-from typing import List
+import json
+from typing import List, Optional
 import threading
 import time
 
 from models import (
     CreateBookCommand, UpdateBookCommand, DeleteBookCommand,
-    Event, BookAggregate, EventType
+    Event, BookAggregate, EventType, CommandBatchRequest, parse_command
 )
 from database import get_db
 from event_store import EventStore, AggregateRepository
 from command_handlers import CommandHandler
-from message_consumer import MessageConsumer
+from message_consumer import MessageConsumer, RETRY
+from existence_filter import AggregateExistenceFilter
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -50,6 +53,78 @@ command_processing_duration = Histogram(
     ['command_type']
 )
 
+def store_events(event_store: EventStore, aggregate_id: uuid.UUID, events: List[Event]) -> List[Event]:
+    """Append events produced by a command in one transaction"""
+    if not events:
+        return events
+    
+    events = event_store.append_events(aggregate_id, events[0].event_version - 1, events)
+    for event in events:
+        events_stored_total.labels(event_type=event.event_type).inc()
+    return events
+
+def command_result(events: List[Event]) -> dict:
+    """Describe stored events for acknowledgement and publishing"""
+    return {
+        'status': 'success',
+        'events': [
+            {
+                'event_type': event.event_type,
+                'event_data': event.event_data,
+                'aggregate_id': str(event.aggregate_id),
+                'event_version': event.event_version,
+                'position': event.id,
+                'occurred_at': event.occurred_at
+            }
+            for event in events
+        ]
+    }
+
+def consistency_token(events: List[Event]) -> dict:
+    """What a client passes to query-service (min_version / after) to read its own write"""
+    last = events[-1]
+    return {
+        "aggregate_id": str(last.aggregate_id),
+        "event_version": last.event_version,
+        "position": last.id
+    }
+
+def is_transient(error: Exception) -> bool:
+    """Whether a command failed for operational reasons (database unavailable), so a redelivery can succeed"""
+    return isinstance(error, (OperationalError, InterfaceError, PoolTimeoutError))
+
+def record_command_outcome(command, outcome, duration: float):
+    """Update command and event metrics for one processed command"""
+    command_type = command.command_type.value
+    if isinstance(outcome, Exception):
+        commands_processed_total.labels(command_type=command_type, status='error').inc()
+        return
+    
+    for event in outcome:
+        events_stored_total.labels(event_type=event.event_type).inc()
+    command_processing_duration.labels(command_type=command_type).observe(duration)
+    commands_processed_total.labels(command_type=command_type, status='success').inc()
+
+def event_to_dict(event: Event) -> dict:
+    """Describe stored event for the global feed"""
+    return {
+        "id": event.id,
+        "aggregate_id": str(event.aggregate_id),
+        "event_type": event.event_type,
+        "event_data": event.event_data,
+        "event_version": event.event_version,
+        "occurred_at": event.occurred_at
+    }
+
+def publish_command_events(events: List[Event]):
+    """Publish events stored by HTTP command endpoints through the consumer connection"""
+    if message_consumer is None or not events:
+        return
+    try:
+        message_consumer.publish_results_threadsafe([command_result(events)])
+    except Exception as e:
+        print(f"Failed to schedule event publishing: {e}")
+
 # Initialize Prometheus instrumentation
 instrumentator = Instrumentator()
 instrumentator.instrument(app).expose(app)
@@ -58,67 +133,101 @@ instrumentator.instrument(app).expose(app)
 message_consumer = None
 consumer_thread = None
 
+# Existence filter over aggregate ids, shared by all command paths
+aggregate_filter = AggregateExistenceFilter()
+
+def warm_aggregate_filter():
+    """Load known aggregate ids into the existence filter"""
+    try:
+        with next(get_db()) as db:
+            aggregate_filter.warm(db)
+    except Exception as e:
+        print(f"Failed to warm existence filter: {e}")
+
 @app.on_event("startup")
 def startup_event():
     """Initialize message consumer on startup"""
     global message_consumer, consumer_thread
     
+    # Warm existence filter in background; until ready every check falls back to the database
+    threading.Thread(target=warm_aggregate_filter, daemon=True).start()
+    
     def command_processor(message):
         """Process incoming commands"""
+        command_type = message.get('command_type')
         try:
             with next(get_db()) as db:
-                event_store = EventStore(db)
+                event_store = EventStore(db, existence_filter=aggregate_filter)
                 repository = AggregateRepository(event_store)
                 handler = CommandHandler(repository)
                 
-                command_type = message.get('command_type')
                 command_data = message.get('command_data', {})
                 
                 start_time = time.time()
                 
-                if command_type == 'create_book':
-                    command = CreateBookCommand(**command_data)
-                    events = handler.handle_create_book(command)
-                elif command_type == 'update_book':
-                    command = UpdateBookCommand(**command_data)
-                    events = handler.handle_update_book(command)
-                elif command_type == 'delete_book':
-                    command = DeleteBookCommand(**command_data)
-                    events = handler.handle_delete_book(command)
-                else:
-                    raise ValueError(f"Unknown command type: {command_type}")
+                command = parse_command(command_type, command_data)
+                events = handler.handle(command)
                 
                 # Save events
-                for event in events:
-                    event_store.save_event(event)
-                    events_stored_total.labels(event_type=event.event_type).inc()
+                events = store_events(event_store, command.aggregate_id, events)
                 
                 # Update metrics
                 duration = time.time() - start_time
                 command_processing_duration.labels(command_type=command_type).observe(duration)
                 commands_processed_total.labels(command_type=command_type, status='success').inc()
                 
-                return {
-                    'status': 'success',
-                    'events': [
-                        {
-                            'event_type': event.event_type,
-                            'event_data': event.event_data
-                        }
-                        for event in events
-                    ]
-                }
+                return command_result(events)
                 
         except Exception as e:
             commands_processed_total.labels(command_type=command_type, status='error').inc()
             print(f"Error processing command: {e}")
-            return {'status': 'error', 'message': str(e)}
+            return {'status': RETRY if is_transient(e) else 'error', 'message': str(e)}
+    
+    def command_batch_processor(messages):
+        """Process a micro-batch of commands with one header query and one append transaction"""
+        start_time = time.time()
+        results = [None] * len(messages)
+        
+        commands = []
+        for index, message in enumerate(messages):
+            try:
+                command = parse_command(message.get('command_type'), message.get('command_data', {}))
+                commands.append((index, command))
+            except Exception as e:
+                commands_processed_total.labels(command_type=message.get('command_type'), status='error').inc()
+                results[index] = {'status': 'error', 'message': str(e)}
+        
+        try:
+            with next(get_db()) as db:
+                event_store = EventStore(db, existence_filter=aggregate_filter)
+                handler = CommandHandler(AggregateRepository(event_store))
+                outcomes = handler.process_commands([command for _, command in commands])
+        except Exception as e:
+            if not is_transient(e):
+                # Isolate the command that breaks the batch instead of dropping all of them
+                print(f"Error processing command batch, retrying commands one by one: {e}")
+                for index, _ in commands:
+                    results[index] = command_processor(messages[index])
+                return results
+            # Every command of the batch is requeued and retried once the database is back
+            print(f"Error processing command batch, requeueing: {e}")
+            outcomes = [e] * len(commands)
+        
+        duration = (time.time() - start_time) / max(1, len(commands))
+        for (index, command), outcome in zip(commands, outcomes):
+            record_command_outcome(command, outcome, duration)
+            if isinstance(outcome, Exception):
+                results[index] = {'status': RETRY if is_transient(outcome) else 'error', 'message': str(outcome)}
+            else:
+                results[index] = command_result(outcome)
+        
+        return results
     
     # Start message consumer in separate thread
     message_consumer = MessageConsumer()
     consumer_thread = threading.Thread(
         target=message_consumer.start_consuming,
-        args=(command_processor,),
+        args=(command_processor, command_batch_processor),
         daemon=True
     )
     consumer_thread.start()
@@ -147,22 +256,21 @@ def health_check():
 def create_book_command(command: CreateBookCommand, db: Session = Depends(get_db)):
     """Process create book command"""
     try:
-        event_store = EventStore(db)
+        event_store = EventStore(db, existence_filter=aggregate_filter)
         repository = AggregateRepository(event_store)
         handler = CommandHandler(repository)
         
         events = handler.handle_create_book(command)
         
         # Save events
-        for event in events:
-            event_store.save_event(event)
-            events_stored_total.labels(event_type=event.event_type).inc()
+        events = store_events(event_store, command.aggregate_id, events)
+        publish_command_events(events)
         
         commands_processed_total.labels(command_type='create_book', status='success').inc()
         
         return {
             "message": "Book creation command processed",
-            "aggregate_id": str(command.aggregate_id),
+            **consistency_token(events),
             "events_count": len(events)
         }
     
@@ -174,22 +282,21 @@ def create_book_command(command: CreateBookCommand, db: Session = Depends(get_db
 def update_book_command(command: UpdateBookCommand, db: Session = Depends(get_db)):
     """Process update book command"""
     try:
-        event_store = EventStore(db)
+        event_store = EventStore(db, existence_filter=aggregate_filter)
         repository = AggregateRepository(event_store)
         handler = CommandHandler(repository)
         
         events = handler.handle_update_book(command)
         
         # Save events
-        for event in events:
-            event_store.save_event(event)
-            events_stored_total.labels(event_type=event.event_type).inc()
+        events = store_events(event_store, command.aggregate_id, events)
+        publish_command_events(events)
         
         commands_processed_total.labels(command_type='update_book', status='success').inc()
         
         return {
             "message": "Book update command processed",
-            "aggregate_id": str(command.aggregate_id),
+            **consistency_token(events),
             "events_count": len(events)
         }
     
@@ -201,22 +308,21 @@ def update_book_command(command: UpdateBookCommand, db: Session = Depends(get_db
 def delete_book_command(command: DeleteBookCommand, db: Session = Depends(get_db)):
     """Process delete book command"""
     try:
-        event_store = EventStore(db)
+        event_store = EventStore(db, existence_filter=aggregate_filter)
         repository = AggregateRepository(event_store)
         handler = CommandHandler(repository)
         
         events = handler.handle_delete_book(command)
         
         # Save events
-        for event in events:
-            event_store.save_event(event)
-            events_stored_total.labels(event_type=event.event_type).inc()
+        events = store_events(event_store, command.aggregate_id, events)
+        publish_command_events(events)
         
         commands_processed_total.labels(command_type='delete_book', status='success').inc()
         
         return {
             "message": "Book deletion command processed",
-            "aggregate_id": str(command.aggregate_id),
+            **consistency_token(events),
             "events_count": len(events)
         }
     
@@ -224,6 +330,65 @@ def delete_book_command(command: DeleteBookCommand, db: Session = Depends(get_db
         commands_processed_total.labels(command_type='delete_book', status='error').inc()
         raise HTTPException(status_code=400, detail=str(e))
 
+@app.post("/commands/batch")
+def batch_commands(batch: CommandBatchRequest, db: Session = Depends(get_db)):
+    """Process a mixed batch of create/update/delete commands"""
+    start_time = time.time()
+    results = [None] * len(batch.commands)
+    
+    commands = []
+    for index, command_data in enumerate(batch.commands):
+        command_type = command_data.get('command_type')
+        try:
+            command = parse_command(command_type, command_data)
+            commands.append((index, command))
+        except Exception as e:
+            commands_processed_total.labels(command_type=str(command_type), status='error').inc()
+            results[index] = {"index": index, "status": "error", "detail": str(e)}
+    
+    try:
+        event_store = EventStore(db, existence_filter=aggregate_filter)
+        handler = CommandHandler(AggregateRepository(event_store))
+        outcomes = handler.process_commands([command for _, command in commands])
+    except Exception as e:
+        for _, command in commands:
+            commands_processed_total.labels(command_type=command.command_type.value, status='error').inc()
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    publish_command_events([event for outcome in outcomes if isinstance(outcome, list) for event in outcome])
+    
+    duration = (time.time() - start_time) / max(1, len(commands))
+    for (index, command), outcome in zip(commands, outcomes):
+        record_command_outcome(command, outcome, duration)
+        result = {
+            "index": index,
+            "command_type": command.command_type.value,
+            "aggregate_id": str(command.aggregate_id)
+        }
+        if isinstance(outcome, Exception):
+            result.update(status="error", detail=str(outcome))
+        else:
+            result.update(status="success", events_count=len(outcome), **consistency_token(outcome))
+        results[index] = result
+    
+    succeeded = sum(1 for result in results if result["status"] == "success")
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
+
+@app.get("/events/stream")
+def stream_events(after: int = Query(0, ge=0), event_type: Optional[str] = None):
+    """Stream the global event feed after a position as NDJSON"""
+    def generate():
+        with next(get_db()) as db:
+            event_store = EventStore(db)
+            for event in event_store.stream_events_after(after, event_type):
+                yield json.dumps(event_to_dict(event), default=str) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
 @app.get("/events/{aggregate_id}")
 def get_events_by_aggregate(aggregate_id: str, db: Session = Depends(get_db)):
     """Get all events for a specific aggregate"""
@@ -286,25 +451,25 @@ def get_aggregate(aggregate_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/events")
-def get_all_events(event_type: str = None, db: Session = Depends(get_db)):
-    """Get all events, optionally filtered by type"""
+def get_all_events(
+    after: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    event_type: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get a page of the global event feed after a position, optionally filtered by type"""
     try:
         event_store = EventStore(db)
-        events = event_store.get_all_events(event_type)
+        events = event_store.get_events_after(after, limit + 1, event_type)
+        
+        has_more = len(events) > limit
+        events = events[:limit]
         
         return {
-            "events": [
-                {
-                    "id": event.id,
-                    "aggregate_id": str(event.aggregate_id),
-                    "event_type": event.event_type,
-                    "event_data": event.event_data,
-                    "event_version": event.event_version,
-                    "occurred_at": event.occurred_at
-                }
-                for event in events
-            ],
-            "total_count": len(events)
+            "events": [event_to_dict(event) for event in events],
+            "count": len(events),
+            "next_after": events[-1].id if events else after,
+            "has_more": has_more
         }
     
     except Exception as e:
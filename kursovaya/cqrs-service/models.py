@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List, Union
+import os
 import uuid
 from datetime import datetime
 from enum import Enum
@@ -28,6 +29,27 @@ class DeleteBookCommand(BaseModel):
     command_type: CommandType = CommandType.DELETE_BOOK
     aggregate_id: uuid.UUID
 
+MAX_BATCH_COMMANDS = int(os.getenv("MAX_BATCH_COMMANDS", "1000"))
+
+class CommandBatchRequest(BaseModel):
+    # Each item carries its command_type plus the fields of that command
+    commands: List[Dict[str, Any]] = Field(..., min_length=1, max_length=MAX_BATCH_COMMANDS)
+
+COMMAND_MODELS = {
+    CommandType.CREATE_BOOK: CreateBookCommand,
+    CommandType.UPDATE_BOOK: UpdateBookCommand,
+    CommandType.DELETE_BOOK: DeleteBookCommand,
+}
+
+def parse_command(command_type: str, command_data: Dict[str, Any]
+                  ) -> Union[CreateBookCommand, UpdateBookCommand, DeleteBookCommand]:
+    """Build command model from its type name and payload"""
+    try:
+        command_model = COMMAND_MODELS[CommandType(command_type)]
+    except ValueError:
+        raise ValueError(f"Unknown command type: {command_type}")
+    return command_model(**command_data)
+
 # Events
 class EventType(str, Enum):
     BOOK_CREATED = "book_created"
@@ -65,6 +87,11 @@ class BookDeletedEvent(BaseModel):
     deleted_at: datetime
 
 # Aggregate
+class AggregateHeader(BaseModel):
+    aggregate_id: uuid.UUID
+    version: int
+    is_deleted: bool = False
+
 class BookAggregate(BaseModel):
     id: uuid.UUID
     title: Optional[str] = None
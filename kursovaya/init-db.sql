@@ -22,6 +22,16 @@ CREATE TABLE IF NOT EXISTS event_store (
     UNIQUE(aggregate_id, event_version)
 );
 
+-- Create aggregate snapshots table (serialized aggregate state at a given version)
+CREATE TABLE IF NOT EXISTS aggregate_snapshots (
+    aggregate_id UUID NOT NULL,
+    version INTEGER NOT NULL,
+    aggregate_type VARCHAR(100) NOT NULL,
+    state JSONB NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (aggregate_id, version)
+);
+
 -- Create read models table for CQRS
 CREATE TABLE IF NOT EXISTS book_read_models (
     id UUID PRIMARY KEY,
@@ -33,12 +43,38 @@ CREATE TABLE IF NOT EXISTS book_read_models (
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
+-- Create projection checkpoints table (last event store position applied by each projection)
+CREATE TABLE IF NOT EXISTS projection_checkpoints (
+    name VARCHAR(100) PRIMARY KEY,
+    position BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create read model tombstones table (version at which a book was deleted; blocks replayed creations)
+CREATE TABLE IF NOT EXISTS book_read_model_tombstones (
+    id UUID PRIMARY KEY,
+    version INTEGER NOT NULL,
+    deleted_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create book statistics table (counters maintained incrementally by the query-service projector)
+CREATE TABLE IF NOT EXISTS book_statistics (
+    kind VARCHAR(20) NOT NULL,
+    key VARCHAR(255) NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (kind, key)
+);
+
 -- Create indexes for better performance
 CREATE INDEX IF NOT EXISTS idx_books_title ON books(title);
 CREATE INDEX IF NOT EXISTS idx_books_author ON books(author);
 CREATE INDEX IF NOT EXISTS idx_event_store_aggregate_id ON event_store(aggregate_id);
 CREATE INDEX IF NOT EXISTS idx_event_store_aggregate_type ON event_store(aggregate_type);
+CREATE INDEX IF NOT EXISTS idx_event_store_event_type_id ON event_store(event_type, id);
 CREATE INDEX IF NOT EXISTS idx_book_read_models_title ON book_read_models(title);
+-- Keyset pagination orders (see query-service/pagination.py)
+CREATE INDEX IF NOT EXISTS idx_book_read_models_created_at_id ON book_read_models(created_at, id);
+CREATE INDEX IF NOT EXISTS idx_book_read_models_title_id ON book_read_models(title, id);
 
 -- Insert some sample data
 INSERT INTO books (title, description, author) VALUES 
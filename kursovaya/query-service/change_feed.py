@@ -0,0 +1,131 @@
+import os
+import select
+import threading
+import time
+from typing import Callable, List, Optional
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from database import DATABASE_URL, EventStoreDB, ProjectionCheckpointDB, BookReadModelDB
+from partitioning import partition_sql
+
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "false").lower() == "true"
+EVENT_STORE_NOTIFY_CHANNEL = os.getenv("EVENT_STORE_NOTIFY_CHANNEL", "event_store_changes")
+# Without notifications the listener still checks the store this often
+CHANGE_FEED_POLL_INTERVAL = float(os.getenv("CHANGE_FEED_POLL_INTERVAL", "5"))
+
+def get_head_position(db: Session) -> int:
+    """Latest position (id) in the event store"""
+    return db.query(func.max(EventStoreDB.id)).scalar() or 0
+
+def events_after(db: Session, position: int, partition: Optional[int] = None, partitions: int = 1):
+    """Query of events after a position, optionally of one aggregate partition"""
+    query = db.query(EventStoreDB).filter(EventStoreDB.id > position)
+    if partition is not None and partitions > 1:
+        query = query.filter(text(f"{partition_sql('aggregate_id', partitions)} = {int(partition)}"))
+    return query
+
+def fetch_events_after(db: Session, position: int, limit: int,
+                       partition: Optional[int] = None, partitions: int = 1) -> List[EventStoreDB]:
+    """Events committed after a position, in position order, optionally of one aggregate partition"""
+    return events_after(db, position, partition, partitions).order_by(EventStoreDB.id).limit(limit).all()
+
+def count_events_after(db: Session, position: int, limit: int,
+                       partition: Optional[int] = None, partitions: int = 1) -> int:
+    """Number of events after a position (counting stops at limit), optionally of one aggregate partition"""
+    pending = events_after(db, position, partition, partitions).with_entities(EventStoreDB.id).limit(limit).subquery()
+    return db.query(func.count()).select_from(pending).scalar()
+
+def load_checkpoint(db: Session, name: str) -> Optional[int]:
+    """Last position stored for a projection, None if it never ran"""
+    checkpoint = db.query(ProjectionCheckpointDB).filter(ProjectionCheckpointDB.name == name).first()
+    return checkpoint.position if checkpoint else None
+
+def save_checkpoint(db: Session, name: str, position: int):
+    """Store projection position in the caller's transaction"""
+    statement = pg_insert(ProjectionCheckpointDB).values(name=name, position=position)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ProjectionCheckpointDB.name],
+        set_={'position': statement.excluded.position, 'updated_at': func.now()}
+    )
+    db.execute(statement)
+
+def initial_position(db: Session, name: str, prefix: str) -> int:
+    """Checkpoint to resume from"""
+    position = load_checkpoint(db, name)
+    if position is not None:
+        return position
+    
+    # New checkpoint (e.g. worker count changed): start at the lowest one of the same
+    # projection, replaying a little is harmless thanks to version guards
+    position = db.query(func.min(ProjectionCheckpointDB.position)).filter(
+        ProjectionCheckpointDB.name.like(f"{prefix}%")
+    ).scalar()
+    if position is not None:
+        return position
+    
+    # Read models built before checkpoints existed are taken as current
+    if db.query(BookReadModelDB.id).first() is None:
+        return 0
+    return get_head_position(db)
+
+class ChangeFeedListener:
+    """LISTENs for event store appends and reports the newest position"""
+    
+    def __init__(self, on_change: Callable[[Optional[int]], None],
+                 channel: str = EVENT_STORE_NOTIFY_CHANNEL, poll_interval: float = CHANGE_FEED_POLL_INTERVAL):
+        self.on_change = on_change
+        self.channel = channel
+        self.poll_interval = poll_interval
+        self.connection = None
+        self.stopped = False
+    
+    def start(self) -> threading.Thread:
+        """Run listener in a daemon thread"""
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+    
+    def run(self):
+        """Listen for notifications, reconnecting on errors"""
+        while not self.stopped:
+            try:
+                self.connection = psycopg2.connect(DATABASE_URL)
+                self.connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with self.connection.cursor() as cursor:
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                print(f"Listening for event store changes on '{self.channel}'...")
+                
+                # Pick up whatever was committed before LISTEN took effect
+                self.on_change(None)
+                
+                while not self.stopped:
+                    if select.select([self.connection], [], [], self.poll_interval) == ([], [], []):
+                        self.on_change(None)
+                        continue
+                    
+                    self.connection.poll()
+                    positions = [int(notify.payload) for notify in self.connection.notifies if notify.payload.isdigit()]
+                    self.connection.notifies.clear()
+                    self.on_change(max(positions) if positions else None)
+            
+            except Exception as e:
+                print(f"Change feed listener error: {e}")
+                time.sleep(1)
+            finally:
+                self.close_connection()
+    
+    def close_connection(self):
+        """Close LISTEN connection"""
+        if self.connection is not None and not self.connection.closed:
+            self.connection.close()
+        self.connection = None
+    
+    def stop(self):
+        """Stop listening"""
+        self.stopped = True
+        self.close_connection()
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import os
+import threading
+import uuid
+from typing import Dict, List, Optional, Set
+
+from prometheus_client import Counter, Gauge
+
+from models import BookReadModel
+from projection_batch import BookChange, ProjectionListener
+
+# Changes buffered per subscriber before it is told to resync
+CHANGE_STREAM_BUFFER = int(os.getenv("CHANGE_STREAM_BUFFER", "256"))
+CHANGE_STREAM_HEARTBEAT = float(os.getenv("CHANGE_STREAM_HEARTBEAT", "15"))
+
+# Buffered in place of dropped changes: the client has to refetch what it follows
+RESYNC = 'resync'
+
+# Prometheus metrics
+change_stream_subscribers = Gauge(
+    'change_stream_subscribers',
+    'Number of connected change stream subscribers'
+)
+
+change_stream_resyncs_total = Counter(
+    'change_stream_resyncs_total',
+    'Total number of times a slow subscriber overflowed its buffer and was told to resync'
+)
+
+class StreamedChange:
+    """A committed change, serialized once for all subscribers"""
+    __slots__ = ('book_id', 'authors', 'event', 'data')
+    
+    def __init__(self, change: BookChange):
+        self.book_id = change.book_id
+        self.authors = {row['author'].lower() for row in (change.before, change.after) if row}
+        if change.after is None:
+            self.event = 'deleted'
+            payload = {'type': self.event, 'book_id': str(change.book_id)}
+        else:
+            self.event = 'created' if change.before is None else 'updated'
+            payload = {'type': self.event, 'book_id': str(change.book_id),
+                       'book': BookReadModel(**change.after).model_dump(mode="json")}
+        self.data = json.dumps(payload, ensure_ascii=False)
+
+class Subscription:
+    """One client's filter and bounded buffer; used only on its event loop"""
+    
+    def __init__(self, author: Optional[str], book_ids: Optional[Set[uuid.UUID]], buffer_size: int):
+        self.author = author.lower() if author else None
+        self.book_ids = book_ids or None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+    
+    def matches(self, change: StreamedChange) -> bool:
+        if self.book_ids is not None and change.book_id not in self.book_ids:
+            return False
+        return self.author is None or self.author in change.authors
+    
+    def offer(self, item):
+        """Buffer an item; when full, drop the backlog and ask the client to resync"""
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+            change_stream_resyncs_total.inc()
+            if item is RESYNC:
+                return
+        self.queue.put_nowait(item)
+
+class ChangeBroadcaster(ProjectionListener):
+    """Pushes committed read model changes to streaming subscribers"""
+    
+    def __init__(self, buffer_size: int = CHANGE_STREAM_BUFFER):
+        self.buffer_size = max(2, buffer_size)
+        self.lock = threading.Lock()
+        # Subscribers grouped by event loop: one thread hop per batch and loop, not per subscriber
+        self.subscribers: Dict[asyncio.AbstractEventLoop, Set[Subscription]] = {}
+    
+    def subscribe(self, author: Optional[str] = None, book_ids: Optional[Set[uuid.UUID]] = None) -> Subscription:
+        """Register a subscriber on the running event loop"""
+        subscription = Subscription(author, book_ids, self.buffer_size)
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            self.subscribers.setdefault(loop, set()).add(subscription)
+            change_stream_subscribers.set(sum(len(group) for group in self.subscribers.values()))
+        return subscription
+    
+    def unsubscribe(self, subscription: Subscription):
+        """Remove a subscriber"""
+        with self.lock:
+            for loop, group in list(self.subscribers.items()):
+                group.discard(subscription)
+                if not group:
+                    del self.subscribers[loop]
+            change_stream_subscribers.set(sum(len(group) for group in self.subscribers.values()))
+    
+    def committed(self, changes: List[BookChange]):
+        """Serialize a batch once and hand it to every subscriber loop"""
+        with self.lock:
+            loops = list(self.subscribers)
+        if not loops or not changes:
+            return
+        
+        streamed = [StreamedChange(change) for change in changes]
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, loop, streamed)
+            except RuntimeError:
+                # Loop closed (shutdown)
+                pass
+    
+    def reset(self):
+        """Every subscriber's view is invalid after a rebuild"""
+        with self.lock:
+            loops = list(self.subscribers)
+        for loop in loops:
+            try:
+                loop.call_soon_threadsafe(self._dispatch, loop, None)
+            except RuntimeError:
+                pass
+    
+    def _dispatch(self, loop: asyncio.AbstractEventLoop, streamed: Optional[List[StreamedChange]]):
+        """Fan a batch out to the subscribers of this loop (runs on the loop)"""
+        with self.lock:
+            group = list(self.subscribers.get(loop, ()))
+        for subscription in group:
+            if streamed is None:
+                subscription.offer(RESYNC)
+                continue
+            for change in streamed:
+                if subscription.matches(change):
+                    subscription.offer(change)
+
+async def stream_changes(broadcaster: ChangeBroadcaster, author: Optional[str], book_ids: Optional[Set[uuid.UUID]],
+                         sse: bool, heartbeat: float = CHANGE_STREAM_HEARTBEAT):
+    """Yield changes as SSE frames or NDJSON lines until the client goes away"""
+    # Subscribed on first iteration so that the finally below always unsubscribes
+    subscription = broadcaster.subscribe(author=author, book_ids=book_ids)
+    try:
+        while True:
+            try:
+                item = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing idle connections
+                yield ": keep-alive\n\n" if sse else "\n"
+                continue
+            
+            if item is RESYNC:
+                event, data = RESYNC, json.dumps({'type': RESYNC})
+            else:
+                event, data = item.event, item.data
+            yield f"event: {event}\ndata: {data}\n\n" if sse else data + "\n"
+    finally:
+        broadcaster.unsubscribe(subscription)
@@ -0,0 +1,101 @@
+import math
+import os
+import threading
+import uuid
+from typing import Callable, Dict, List, Optional
+
+from prometheus_client import Counter
+
+from change_feed import get_head_position
+from database import get_db
+from projection_batch import BookChange, ProjectionListener
+
+# How long read endpoints wait for the projector when a client passes min_version / after
+CONSISTENCY_WAIT_TIMEOUT = float(os.getenv("CONSISTENCY_WAIT_TIMEOUT", "5"))
+CONSISTENCY_WAIT_MAX = float(os.getenv("CONSISTENCY_WAIT_MAX", "30"))
+
+# Prometheus metrics
+consistency_waits_total = Counter(
+    'consistency_waits_total',
+    'Total number of reads that waited for the projection to catch up',
+    ['kind', 'result']
+)
+
+class UnknownPosition(ValueError):
+    pass
+
+class ConsistencyWaiter(ProjectionListener):
+    """Blocks reads until the projector applied a book version or event store position"""
+    
+    def __init__(self, projector):
+        self.projector = projector
+        self.condition = threading.Condition()
+        # Versions seen in committed batches, only for books someone is waiting on
+        self.watched: Dict[uuid.UUID, int] = {}
+        self.seen_versions: Dict[uuid.UUID, float] = {}
+    
+    def committed(self, changes: List[BookChange]):
+        """Wake readers waiting on books in the batch"""
+        with self.condition:
+            woken = False
+            for change in changes:
+                if change.book_id in self.watched:
+                    # A deleted book will never reach a higher version; stop waiting for it
+                    self.seen_versions[change.book_id] = change.after['version'] if change.after else math.inf
+                    woken = True
+            if woken:
+                self.condition.notify_all()
+    
+    def position_applied(self, position: int):
+        """Wake readers waiting on event store positions"""
+        with self.condition:
+            self.condition.notify_all()
+    
+    def wait_for_version(self, book_id: uuid.UUID, min_version: int,
+                         current_version: Callable[[], Optional[int]], timeout: float) -> bool:
+        """True once the book's read model version is at least min_version"""
+        with self.condition:
+            self.watched[book_id] = self.watched.get(book_id, 0) + 1
+        try:
+            # Watch first, then check: a change committed in between is not missed
+            version = current_version()
+            if version is not None and version >= min_version:
+                consistency_waits_total.labels(kind='version', result='immediate').inc()
+                return True
+            
+            with self.condition:
+                reached = self.condition.wait_for(
+                    lambda: self.seen_versions.get(book_id, 0) >= min_version, timeout
+                )
+            consistency_waits_total.labels(kind='version', result='reached' if reached else 'timeout').inc()
+            return reached
+        finally:
+            with self.condition:
+                remaining = self.watched[book_id] - 1
+                if remaining:
+                    self.watched[book_id] = remaining
+                else:
+                    del self.watched[book_id]
+                    self.seen_versions.pop(book_id, None)
+    
+    def wait_for_position(self, position: int, timeout: float, book_id: Optional[uuid.UUID] = None) -> bool:
+        """True once event store position is applied (by the book's worker, or by every worker)"""
+        if self.projector.applied_position(book_id) >= position:
+            consistency_waits_total.labels(kind='position', result='immediate').inc()
+            return True
+        
+        # The position comes from the client: it is checked against event_store before the projector sees
+        # it, which would otherwise skip every real event below it
+        with next(get_db()) as db:
+            head = get_head_position(db)
+        if position > head:
+            consistency_waits_total.labels(kind='position', result='unknown').inc()
+            raise UnknownPosition(f"Position {position} is beyond the event store head")
+        
+        self.projector.request_position(position, book_id)
+        with self.condition:
+            reached = self.condition.wait_for(
+                lambda: self.projector.applied_position(book_id) >= position, timeout
+            )
+        consistency_waits_total.labels(kind='position', result='reached' if reached else 'timeout').inc()
+        return reached
@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine, Column, String, Text, DateTime, UUID, Integer
+from sqlalchemy import create_engine, Column, String, Text, DateTime, UUID, Integer, BigInteger, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
@@ -22,6 +22,41 @@ class BookReadModelDB(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+class BookTombstoneDB(Base):
+    # Deleted books with the version of their deletion; creations at or below it are not projected again
+    __tablename__ = "book_read_model_tombstones"
+    
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class BookStatisticDB(Base):
+    # Counters maintained by the projector: kind 'author' (key = author) or 'created' (key = time bucket)
+    __tablename__ = "book_statistics"
+    
+    kind = Column(String(20), primary_key=True)
+    key = Column(String(255), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+
+class ProjectionCheckpointDB(Base):
+    __tablename__ = "projection_checkpoints"
+    
+    name = Column(String(100), primary_key=True)
+    position = Column(BigInteger, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class EventStoreDB(Base):
+    # Owned by cqrs-service; read here to tail the change feed by position
+    __tablename__ = "event_store"
+    
+    id = Column(Integer, primary_key=True)
+    aggregate_id = Column(UUID(as_uuid=True), nullable=False)
+    aggregate_type = Column(String(100), nullable=False)
+    event_type = Column(String(100), nullable=False)
+    event_data = Column(JSON, nullable=False)
+    event_version = Column(Integer, nullable=False)
+    occurred_at = Column(DateTime(timezone=True))
+
 def get_db():
     db = SessionLocal()
     try:
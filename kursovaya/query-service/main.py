@@ -1,18 +1,32 @@
 from fastapi import FastAPI, HTTPException, Depends, Query
-from fastapi.responses import Response
+from fastapi.responses import Response, StreamingResponse, JSONResponse
+from fastapi.encoders import jsonable_encoder
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
+from sqlalchemy import desc, any_, cast, and_, false
+from sqlalchemy.dialects.postgresql import ARRAY
 from prometheus_client import Counter, Histogram, Gauge, generate_latest, CONTENT_TYPE_LATEST
 from prometheus_fastapi_instrumentator import Instrumentator
+import os
 import uuid
-from typing import List, Optional
+from typing import List, Optional, Tuple
 import threading
 from datetime import datetime, timedelta
 from collections import Counter as CollectionCounter
 
-from models import BookReadModel, BookSearchRequest, BookStatistics
+from models import BookReadModel, BookSearchRequest, BookStatistics, BookBatchGetRequest, BookBatchGetResult
 from database import get_db, BookReadModelDB
 from event_projector import EventProjector
+from change_feed import ChangeFeedListener, CHANGE_FEED_ENABLED
+from read_model_rebuild import ReadModelRebuilder
+from statistics_projection import StatisticsProjection
+from pagination import paginate, InvalidCursor, NEXT_CURSOR_HEADER
+from search_index import SearchIndex, SEARCH_INDEX_ENABLED, normalize, tokens
+from query_cache import QueryCache, QUERY_CACHE_ENABLED, LIST_TAG, AUTHORS_TAG, book_tag, author_tag
+from read_model_replica import ReadModelReplica, READ_MODEL_REPLICA_ENABLED
+from consistency import ConsistencyWaiter, UnknownPosition, CONSISTENCY_WAIT_TIMEOUT, CONSISTENCY_WAIT_MAX
+from change_stream import ChangeBroadcaster, stream_changes
+from recent_books import RecentBooks, RECENT_BOOKS_ENABLED
+from fieldsets import parse_fields, select_columns, InvalidFields
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -28,6 +42,9 @@ async def add_utf8_header(request, call_next):
         response.headers["content-type"] = "application/json; charset=utf-8"
     return response
 
+# Largest number of ids accepted by POST /books/batch-get
+BATCH_GET_MAX_IDS = int(os.getenv("BATCH_GET_MAX_IDS", "500"))
+
 # Prometheus metrics
 queries_total = Counter(
     'queries_total',
@@ -41,6 +58,18 @@ query_duration_seconds = Histogram(
     ['query_type']
 )
 
+query_cache_hits_total = Counter(
+    'query_cache_hits_total',
+    'Total number of queries answered from the result cache',
+    ['query_type']
+)
+
+query_cache_misses_total = Counter(
+    'query_cache_misses_total',
+    'Total number of queries that missed the result cache',
+    ['query_type']
+)
+
 read_models_count = Gauge(
     'read_models_count',
     'Number of read models in the system'
@@ -53,24 +82,152 @@ instrumentator.instrument(app).expose(app)
 # Global variables for event projector
 event_projector = None
 projector_thread = None
+change_feed_listener = None
+read_model_rebuilder = None
+statistics_projection = None
+search_index = None
+query_cache = None
+read_model_replica = None
+consistency_waiter = None
+change_broadcaster = None
+recent_books = None
+
+def to_book_read_model(book) -> BookReadModel:
+    """Response model from any row object (ORM or replica)"""
+    return BookReadModel(
+        id=book.id,
+        title=book.title,
+        description=book.description,
+        author=book.author,
+        version=book.version,
+        created_at=book.created_at,
+        updated_at=book.updated_at
+    )
+
+def project_books(books, fields: Optional[Tuple[str, ...]]) -> list:
+    """Response models, or dicts of only the requested fields"""
+    if fields is None:
+        return [to_book_read_model(book) for book in books]
+    return [{field: getattr(book, field) for field in fields} for book in books]
+
+def book_list_response(books: list, fields: Optional[Tuple[str, ...]], next_cursor: Optional[str] = None):
+    """Full models for FastAPI to validate and serialize, or sparse rows encoded as they are"""
+    if fields is None:
+        return books
+    headers = {NEXT_CURSOR_HEADER: next_cursor} if next_cursor else None
+    return JSONResponse(content=jsonable_encoder(books), headers=headers)
+
+def requested_fields(
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,title,author")
+) -> Optional[Tuple[str, ...]]:
+    """Sparse fieldset of a list request"""
+    try:
+        return parse_fields(fields)
+    except InvalidFields as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def replica_ready() -> bool:
+    """Whether the memory-resident replica can answer"""
+    return read_model_replica is not None and read_model_replica.ready
+
+def read_after(
+    after: Optional[int] = Query(None, ge=1, description="Event store position from a command response to read after"),
+    wait_timeout: float = Query(CONSISTENCY_WAIT_TIMEOUT, gt=0, le=CONSISTENCY_WAIT_MAX)
+):
+    """Hold the request until the projector has applied event store position after"""
+    try:
+        reached = after is None or consistency_waiter.wait_for_position(after, wait_timeout)
+    except UnknownPosition as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not reached:
+        raise HTTPException(status_code=504, detail=f"Read model has not reached position {after} yet")
+
+def cached_query(query_type: str, params: tuple, tags: List[str], compute):
+    """Result of compute, served from the result cache while its tags are unchanged"""
+    if query_cache is None:
+        return compute()
+    hit, value = query_cache.get_or_compute((query_type, *params), tags, compute)
+    if hit:
+        query_cache_hits_total.labels(query_type=query_type).inc()
+    else:
+        query_cache_misses_total.labels(query_type=query_type).inc()
+    return value
+
+def text_filter(column, term: str, match: str):
+    """SQL condition for a search term when the in-memory index cannot answer"""
+    if match == "prefix":
+        # Same words as SearchIndex.prefix: every word of term is a whole word of the field, the last one
+        # possibly incomplete (tokens are \w+, so they need no regex escaping)
+        words = tokens(normalize(term))
+        if not words:
+            return false()
+        *complete, partial = words
+        conditions = [column.regexp_match(rf"\m{word}\M", flags="i") for word in complete]
+        conditions.append(column.regexp_match(rf"\m{partial}", flags="i"))
+        return and_(*conditions)
+    return column.ilike(f"%{term}%")
 
 @app.on_event("startup")
 def startup_event():
     """Initialize event projector on startup"""
-    global event_projector, projector_thread
+    global event_projector, projector_thread, change_feed_listener, read_model_rebuilder
+    global statistics_projection, search_index, query_cache, read_model_replica, consistency_waiter
+    global change_broadcaster, recent_books
     
-    # Start event projector in separate thread
     event_projector = EventProjector()
+    
+    # Counters are loaded before projection starts and then maintained by the projector
+    statistics_projection = StatisticsProjection()
+    statistics_projection.load()
+    event_projector.add_listener(statistics_projection)
+    read_models_count.set(statistics_projection.total)
+    
+    if SEARCH_INDEX_ENABLED:
+        search_index = SearchIndex()
+        search_index.load()
+        event_projector.add_listener(search_index)
+    
+    if QUERY_CACHE_ENABLED:
+        query_cache = QueryCache()
+        event_projector.add_listener(query_cache)
+    
+    if RECENT_BOOKS_ENABLED:
+        recent_books = RecentBooks()
+        recent_books.load()
+        event_projector.add_listener(recent_books)
+    
+    if READ_MODEL_REPLICA_ENABLED:
+        read_model_replica = ReadModelReplica()
+        read_model_replica.load()
+        event_projector.add_listener(read_model_replica)
+    
+    change_broadcaster = ChangeBroadcaster()
+    event_projector.add_listener(change_broadcaster)
+    
+    # Registered last: woken readers see every other listener already updated
+    consistency_waiter = ConsistencyWaiter(event_projector)
+    event_projector.add_listener(consistency_waiter)
+    
+    # Start event projector in separate thread
     projector_thread = threading.Thread(
         target=event_projector.start_consuming,
         daemon=True
     )
     projector_thread.start()
+    
+    read_model_rebuilder = ReadModelRebuilder(projector=event_projector)
+    
+    # Low-latency path: pull new events as soon as event_store NOTIFYs; broker stays as fallback
+    if CHANGE_FEED_ENABLED:
+        change_feed_listener = ChangeFeedListener(on_change=event_projector.notify_position)
+        change_feed_listener.start()
 
 @app.on_event("shutdown")
 def shutdown_event():
     """Cleanup on shutdown"""
     global event_projector
+    if change_feed_listener:
+        change_feed_listener.stop()
     if event_projector:
         try:
             event_projector.close()
@@ -87,45 +244,139 @@ def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "service": "query-service"}
 
-@app.get("/books", response_model=List[BookReadModel])
+@app.post("/admin/rebuild-read-models", status_code=202)
+def rebuild_read_models():
+    """Rebuild book_read_models from event_store in parallel and swap it in"""
+    if not read_model_rebuilder.start():
+        raise HTTPException(status_code=409, detail="Rebuild already running")
+    return read_model_rebuilder.status
+
+@app.get("/admin/rebuild-read-models")
+def get_rebuild_status():
+    """Progress of the read model rebuild"""
+    return read_model_rebuilder.status
+
+@app.get("/books", response_model=List[BookReadModel], dependencies=[Depends(read_after)])
 def get_all_books(
+    response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Continuation token from the X-Next-Cursor header"),
+    sort: str = Query("created_at", pattern="^(created_at|title)$"),
+    fields: Optional[Tuple[str, ...]] = Depends(requested_fields),
     db: Session = Depends(get_db)
 ):
     """Get all books (read models)"""
     try:
-        books = db.query(BookReadModelDB).offset(offset).limit(limit).all()
+        def load():
+            query = select_columns(db.query(BookReadModelDB), fields, sort)
+            books, next_cursor = paginate(query, sort, limit, offset, cursor)
+            return project_books(books, fields), next_cursor
+        
+        books, next_cursor = cached_query('get_all_books', (limit, offset, cursor, sort, fields), [LIST_TAG], load)
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         # Update metrics
         queries_total.labels(query_type='get_all_books', status='success').inc()
-        read_models_count.set(db.query(BookReadModelDB).count())
+        read_models_count.set(statistics_projection.total)
         
-        return [
-            BookReadModel(
-                id=book.id,
-                title=book.title,
-                description=book.description,
-                author=book.author,
-                version=book.version,
-                created_at=book.created_at,
-                updated_at=book.updated_at
-            )
-            for book in books
-        ]
+        return book_list_response(books, fields, next_cursor)
     
+    except InvalidCursor as e:
+        queries_total.labels(query_type='get_all_books', status='error').inc()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         queries_total.labels(query_type='get_all_books', status='error').inc()
         raise HTTPException(status_code=500, detail=f"Failed to get books: {str(e)}")
 
+@app.get("/books/recent", response_model=List[BookReadModel], dependencies=[Depends(read_after)])
+def get_recent_books(
+    hours: int = Query(24, ge=1, le=168),  # Last 24 hours by default, max 1 week
+    limit: int = Query(10, ge=1, le=100),
+    fields: Optional[Tuple[str, ...]] = Depends(requested_fields),
+    db: Session = Depends(get_db)
+):
+    """Get recently created books"""
+    try:
+        since = datetime.utcnow() - timedelta(hours=hours)
+        
+        books = recent_books.recent(since, limit) if recent_books is not None else None
+        if books is None and replica_ready():
+            books = read_model_replica.recent(since, limit)
+        elif books is None:
+            # Windows older than the in-memory buffer: backward scan of idx_book_read_models_created_at_id
+            books = select_columns(db.query(BookReadModelDB), fields).filter(
+                BookReadModelDB.created_at >= since
+            ).order_by(desc(BookReadModelDB.created_at), desc(BookReadModelDB.id)).limit(limit).all()
+        
+        queries_total.labels(query_type='get_recent_books', status='success').inc()
+        
+        return book_list_response(project_books(books, fields), fields)
+    
+    except Exception as e:
+        queries_total.labels(query_type='get_recent_books', status='error').inc()
+        raise HTTPException(status_code=500, detail=f"Failed to get recent books: {str(e)}")
+
+@app.get("/books/changes")
+async def stream_book_changes(
+    author: Optional[str] = Query(None, description="Only changes of books by this author (exact, case-insensitive)"),
+    book_id: Optional[List[uuid.UUID]] = Query(None, description="Only changes of these books"),
+    format: str = Query("sse", pattern="^(sse|ndjson)$")
+):
+    """Stream read model changes as they are projected (Server-Sent Events or NDJSON)"""
+    sse = format == "sse"
+    return StreamingResponse(
+        stream_changes(change_broadcaster, author, set(book_id) if book_id else None, sse),
+        media_type="text/event-stream" if sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.get("/books/{book_id}", response_model=BookReadModel)
-def get_book_by_id(book_id: str, db: Session = Depends(get_db)):
+def get_book_by_id(
+    book_id: str,
+    min_version: Optional[int] = Query(None, ge=1, description="Book version from a command response to read at least"),
+    after: Optional[int] = Query(None, ge=1, description="Event store position from a command response to read after"),
+    wait_timeout: float = Query(CONSISTENCY_WAIT_TIMEOUT, gt=0, le=CONSISTENCY_WAIT_MAX),
+    db: Session = Depends(get_db)
+):
     """Get book by ID from read model"""
     try:
         # Validate UUID
-        uuid.UUID(book_id)
+        book_uuid = uuid.UUID(book_id)
         
-        book = db.query(BookReadModelDB).filter(BookReadModelDB.id == book_id).first()
+        # Read-your-writes: wait for the projector instead of making the client poll
+        if min_version is not None:
+            def current_version():
+                if replica_ready():
+                    row = read_model_replica.get(book_uuid)
+                    return row.version if row else None
+                return db.query(BookReadModelDB.version).filter(BookReadModelDB.id == book_uuid).scalar()
+            
+            if not consistency_waiter.wait_for_version(book_uuid, min_version, current_version, wait_timeout):
+                raise HTTPException(status_code=504, detail=f"Book has not reached version {min_version} yet")
+        if after is not None and not consistency_waiter.wait_for_position(after, wait_timeout, book_uuid):
+            raise HTTPException(status_code=504, detail=f"Read model has not reached position {after} yet")
+        
+        def load():
+            book = db.query(BookReadModelDB).filter(BookReadModelDB.id == book_uuid).first()
+            if not book:
+                return None
+            return BookReadModel(
+                id=book.id,
+                title=book.title,
+                description=book.description,
+                author=book.author,
+                version=book.version,
+                created_at=book.created_at,
+                updated_at=book.updated_at
+            )
+        
+        if replica_ready():
+            row = read_model_replica.get(book_uuid)
+            book = to_book_read_model(row) if row else None
+        else:
+            book = cached_query('get_book_by_id', (book_uuid,), [book_tag(book_uuid)], load)
         
         if not book:
             queries_total.labels(query_type='get_book_by_id', status='not_found').inc()
@@ -133,16 +384,11 @@ def get_book_by_id(book_id: str, db: Session = Depends(get_db)):
         
         queries_total.labels(query_type='get_book_by_id', status='success').inc()
         
-        return BookReadModel(
-            id=book.id,
-            title=book.title,
-            description=book.description,
-            author=book.author,
-            version=book.version,
-            created_at=book.created_at,
-            updated_at=book.updated_at
-        )
+        return book
     
+    except UnknownPosition as e:
+        queries_total.labels(query_type='get_book_by_id', status='error').inc()
+        raise HTTPException(status_code=400, detail=str(e))
     except ValueError:
         queries_total.labels(query_type='get_book_by_id', status='error').inc()
         raise HTTPException(status_code=400, detail="Invalid book ID format")
@@ -152,160 +398,197 @@ def get_book_by_id(book_id: str, db: Session = Depends(get_db)):
         queries_total.labels(query_type='get_book_by_id', status='error').inc()
         raise HTTPException(status_code=500, detail=f"Failed to get book: {str(e)}")
 
-@app.get("/books/by-author/{author}", response_model=List[BookReadModel])
+@app.post("/books/batch-get", response_model=List[BookBatchGetResult], dependencies=[Depends(read_after)])
+def batch_get_books(request: BookBatchGetRequest, db: Session = Depends(get_db)):
+    """Get many books by ID in one lookup, in request order"""
+    if len(request.ids) > BATCH_GET_MAX_IDS:
+        queries_total.labels(query_type='batch_get_books', status='error').inc()
+        raise HTTPException(status_code=400, detail=f"At most {BATCH_GET_MAX_IDS} ids per request")
+    
+    try:
+        ids = list(dict.fromkeys(request.ids))
+        books = {}
+        if replica_ready():
+            for book_id in ids:
+                row = read_model_replica.get(book_id)
+                if row is not None:
+                    books[book_id] = row
+        elif ids:
+            # One primary key lookup with a single array parameter, whatever the number of ids
+            books = {
+                book.id: book
+                for book in db.query(BookReadModelDB).filter(
+                    BookReadModelDB.id == any_(cast(ids, ARRAY(BookReadModelDB.id.type)))
+                )
+            }
+        
+        queries_total.labels(query_type='batch_get_books', status='success').inc()
+        
+        return [
+            BookBatchGetResult(
+                id=book_id,
+                found=book_id in books,
+                book=to_book_read_model(books[book_id]) if book_id in books else None
+            )
+            for book_id in request.ids
+        ]
+    
+    except Exception as e:
+        queries_total.labels(query_type='batch_get_books', status='error').inc()
+        raise HTTPException(status_code=500, detail=f"Failed to get books: {str(e)}")
+
+@app.get("/books/by-author/{author}", response_model=List[BookReadModel], dependencies=[Depends(read_after)])
 def get_books_by_author(
     author: str,
+    response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Continuation token from the X-Next-Cursor header"),
+    sort: str = Query("created_at", pattern="^(created_at|title)$"),
+    fields: Optional[Tuple[str, ...]] = Depends(requested_fields),
     db: Session = Depends(get_db)
 ):
     """Get books by author"""
     try:
-        books = db.query(BookReadModelDB).filter(
-            BookReadModelDB.author.ilike(f"%{author}%")
-        ).offset(offset).limit(limit).all()
+        def load():
+            matched = search_index.match({'author': author}) if search_index else None
+            if matched is not None:
+                # Index already verified the author; rows are fetched by primary key
+                query = db.query(BookReadModelDB).filter(BookReadModelDB.id.in_(matched.book_ids))
+            else:
+                query = db.query(BookReadModelDB).filter(BookReadModelDB.author.ilike(f"%{author}%"))
+            books, next_cursor = paginate(select_columns(query, fields, sort), sort, limit, offset, cursor)
+            return project_books(books, fields), next_cursor
+        
+        # ILIKE ignores case, so does the cache key
+        books, next_cursor = cached_query(
+            'get_books_by_author', (author.lower(), limit, offset, cursor, sort, fields), [author_tag(author)], load
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         queries_total.labels(query_type='get_books_by_author', status='success').inc()
         
-        return [
-            BookReadModel(
-                id=book.id,
-                title=book.title,
-                description=book.description,
-                author=book.author,
-                version=book.version,
-                created_at=book.created_at,
-                updated_at=book.updated_at
-            )
-            for book in books
-        ]
+        return book_list_response(books, fields, next_cursor)
     
+    except InvalidCursor as e:
+        queries_total.labels(query_type='get_books_by_author', status='error').inc()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         queries_total.labels(query_type='get_books_by_author', status='error').inc()
         raise HTTPException(status_code=500, detail=f"Failed to get books by author: {str(e)}")
 
-@app.post("/books/search", response_model=List[BookReadModel])
+@app.post("/books/search", response_model=List[BookReadModel], dependencies=[Depends(read_after)])
 def search_books(
     search_request: BookSearchRequest,
+    response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="Continuation token from the X-Next-Cursor header"),
+    sort: str = Query("created_at", pattern="^(created_at|title|relevance)$"),
+    match: str = Query("contains", pattern="^(contains|prefix)$"),
+    fields: Optional[Tuple[str, ...]] = Depends(requested_fields),
     db: Session = Depends(get_db)
 ):
     """Search books by multiple criteria"""
     try:
-        query = db.query(BookReadModelDB)
-        
-        if search_request.title:
-            query = query.filter(BookReadModelDB.title.ilike(f"%{search_request.title}%"))
+        terms = {
+            'title': search_request.title,
+            'author': search_request.author,
+            'description': search_request.description
+        }
         
-        if search_request.author:
-            query = query.filter(BookReadModelDB.author.ilike(f"%{search_request.author}%"))
+        # Without the index relevance falls back to title order
+        page_sort = "title" if sort == "relevance" else sort
         
-        if search_request.description:
-            query = query.filter(BookReadModelDB.description.ilike(f"%{search_request.description}%"))
+        def load():
+            query = select_columns(db.query(BookReadModelDB), fields, page_sort)
+            
+            # Intersect posting lists in memory, then fetch matching rows by primary key
+            matched = search_index.match(terms, match) if search_index else None
+            if matched is not None:
+                query = query.filter(BookReadModelDB.id.in_(matched.book_ids))
+            else:
+                for field, term in terms.items():
+                    if term:
+                        query = query.filter(text_filter(getattr(BookReadModelDB, field), term, match))
+            
+            if sort == "relevance" and matched is not None:
+                if cursor:
+                    raise InvalidCursor("Cursor pagination is not available for relevance order")
+                ranked = search_index.rank([book_id for (book_id,) in query.with_entities(BookReadModelDB.id)], terms)
+                page = ranked[offset:offset + limit]
+                rows = {
+                    book.id: book
+                    for book in select_columns(db.query(BookReadModelDB), fields).filter(BookReadModelDB.id.in_(page))
+                }
+                books = [rows[book_id] for book_id in page if book_id in rows]
+                next_cursor = None
+            else:
+                books, next_cursor = paginate(query, page_sort, limit, offset, cursor)
+            
+            return project_books(books, fields), next_cursor
         
-        books = query.offset(offset).limit(limit).all()
+        # ILIKE ignores case, so does the cache key
+        params = tuple(term.lower() if term else None for term in terms.values())
+        books, next_cursor = cached_query(
+            'search_books', (*params, limit, offset, cursor, sort, match, fields), [LIST_TAG], load
+        )
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
         
         queries_total.labels(query_type='search_books', status='success').inc()
         
-        return [
-            BookReadModel(
-                id=book.id,
-                title=book.title,
-                description=book.description,
-                author=book.author,
-                version=book.version,
-                created_at=book.created_at,
-                updated_at=book.updated_at
-            )
-            for book in books
-        ]
+        return book_list_response(books, fields, next_cursor)
     
+    except InvalidCursor as e:
+        queries_total.labels(query_type='search_books', status='error').inc()
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         queries_total.labels(query_type='search_books', status='error').inc()
         raise HTTPException(status_code=500, detail=f"Failed to search books: {str(e)}")
 
-@app.get("/books/recent", response_model=List[BookReadModel])
-def get_recent_books(
-    hours: int = Query(24, ge=1, le=168),  # Last 24 hours by default, max 1 week
-    limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
-):
-    """Get recently created books"""
-    try:
-        since = datetime.utcnow() - timedelta(hours=hours)
-        
-        books = db.query(BookReadModelDB).filter(
-            BookReadModelDB.created_at >= since
-        ).order_by(desc(BookReadModelDB.created_at)).limit(limit).all()
-        
-        queries_total.labels(query_type='get_recent_books', status='success').inc()
-        
-        return [
-            BookReadModel(
-                id=book.id,
-                title=book.title,
-                description=book.description,
-                author=book.author,
-                version=book.version,
-                created_at=book.created_at,
-                updated_at=book.updated_at
-            )
-            for book in books
-        ]
-    
-    except Exception as e:
-        queries_total.labels(query_type='get_recent_books', status='error').inc()
-        raise HTTPException(status_code=500, detail=f"Failed to get recent books: {str(e)}")
-
-@app.get("/statistics", response_model=BookStatistics)
-def get_statistics(db: Session = Depends(get_db)):
+@app.get("/statistics", response_model=BookStatistics, dependencies=[Depends(read_after)])
+def get_statistics():
     """Get book statistics"""
     try:
-        # Total books count
-        total_books = db.query(BookReadModelDB).count()
+        # Counters are maintained by the projector; nothing is counted per request
+        total_books = statistics_projection.total
+        read_models_count.set(total_books)
         
-        # Books by author
-        author_counts = db.query(
-            BookReadModelDB.author,
-            func.count(BookReadModelDB.id).label('count')
-        ).group_by(BookReadModelDB.author).all()
-        
-        books_by_author = {author: count for author, count in author_counts}
-        
-        # Most popular author
-        most_popular_author = None
-        if author_counts:
-            most_popular_author = max(author_counts, key=lambda x: x.count)[0]
-        
-        # Recent books (last 24 hours)
-        since = datetime.utcnow() - timedelta(hours=24)
-        recent_books = db.query(BookReadModelDB).filter(
-            BookReadModelDB.created_at >= since
-        ).count()
+        # Exact from the recent books buffer; bucketed counters when the window is older than it
+        recent_count = recent_books.count(datetime.utcnow() - timedelta(hours=24)) if recent_books is not None else None
+        if recent_count is None:
+            recent_count = statistics_projection.recent_count(hours=24)
         
         queries_total.labels(query_type='get_statistics', status='success').inc()
         
         return BookStatistics(
             total_books=total_books,
-            books_by_author=books_by_author,
-            recent_books=recent_books,
-            most_popular_author=most_popular_author
+            books_by_author=statistics_projection.books_by_author(),
+            recent_books=recent_count,
+            most_popular_author=statistics_projection.most_popular_author()
         )
     
     except Exception as e:
         queries_total.labels(query_type='get_statistics', status='error').inc()
         raise HTTPException(status_code=500, detail=f"Failed to get statistics: {str(e)}")
 
-@app.get("/authors", response_model=List[str])
+@app.get("/authors", response_model=List[str], dependencies=[Depends(read_after)])
 def get_all_authors(db: Session = Depends(get_db)):
     """Get list of all unique authors"""
     try:
-        authors = db.query(BookReadModelDB.author).distinct().all()
+        def load():
+            return [author for (author,) in db.query(BookReadModelDB.author).distinct().all()]
+        
+        if replica_ready():
+            authors = read_model_replica.list_authors()
+        else:
+            authors = cached_query('get_all_authors', (), [AUTHORS_TAG], load)
         
         queries_total.labels(query_type='get_all_authors', status='success').inc()
         
-        return [author[0] for author in authors]
+        return authors
     
     except Exception as e:
         queries_total.labels(query_type='get_all_authors', status='error').inc()
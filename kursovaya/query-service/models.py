@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
 import uuid
 from datetime import datetime
 
@@ -17,6 +17,14 @@ class BookSearchRequest(BaseModel):
     author: Optional[str] = None
     description: Optional[str] = None
 
+class BookBatchGetRequest(BaseModel):
+    ids: List[uuid.UUID]
+
+class BookBatchGetResult(BaseModel):
+    id: uuid.UUID
+    found: bool
+    book: Optional[BookReadModel] = None
+
 class BookStatistics(BaseModel):
     total_books: int
     books_by_author: dict
@@ -0,0 +1,60 @@
+import base64
+import binascii
+import json
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+from database import BookReadModelDB
+
+# Stable orderings for list endpoints; each is backed by a composite index in init-db.sql
+SORT_KEYS = {
+    'created_at': BookReadModelDB.created_at,
+    'title': BookReadModelDB.title,
+}
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+class InvalidCursor(ValueError):
+    pass
+
+def encode_cursor(sort: str, book: BookReadModelDB) -> str:
+    """Opaque token pointing just after a book in the given ordering"""
+    value = getattr(book, sort)
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({'s': sort, 'v': value, 'id': str(book.id)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(sort: str, cursor: str) -> tuple:
+    """Sort key and id encoded in a cursor"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        cursor_sort, value, book_id = payload['s'], payload['v'], uuid.UUID(payload['id'])
+        if cursor_sort == 'created_at':
+            value = datetime.fromisoformat(value)
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursor("Malformed cursor")
+    
+    if cursor_sort != sort:
+        raise InvalidCursor("Cursor belongs to a different sort order")
+    return value, book_id
+
+def paginate(query: Query, sort: str, limit: int, offset: int = 0, cursor: Optional[str] = None) -> tuple:
+    """Page through a book query in (sort key, id) order; returns the books and the next cursor"""
+    column = SORT_KEYS[sort]
+    query = query.order_by(column, BookReadModelDB.id)
+    
+    if cursor:
+        # Keyset: seek past the last row instead of skipping offset rows
+        value, book_id = decode_cursor(sort, cursor)
+        query = query.filter(tuple_(column, BookReadModelDB.id) > tuple_(value, book_id))
+    elif offset:
+        query = query.offset(offset)
+    
+    books = query.limit(limit).all()
+    next_cursor = encode_cursor(sort, books[-1]) if len(books) == limit else None
+    return books, next_cursor
@@ -0,0 +1,7 @@
+def partition_for(aggregate_id, partitions: int) -> int:
+    """Partition of an aggregate: low 28 bits of its UUID modulo the partition count"""
+    return int(str(aggregate_id)[-7:], 16) % partitions
+
+def partition_sql(column: str, partitions: int) -> str:
+    """SQL expression computing partition_for() on a UUID column"""
+    return f"(('x' || right({column}::text, 7))::bit(28)::int % {int(partitions)})"
@@ -0,0 +1,252 @@
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional
+import time
+import uuid
+
+from prometheus_client import Histogram
+
+from sqlalchemy import func, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from database import BookReadModelDB, BookTombstoneDB
+
+EVENT_TYPES = {
+    'created': 'created', 'book_created': 'created', 'book.created': 'created',
+    'updated': 'updated', 'book_updated': 'updated', 'book.updated': 'updated',
+    'deleted': 'deleted', 'book_deleted': 'deleted', 'book.deleted': 'deleted',
+}
+
+UPDATABLE_FIELDS = ('title', 'description', 'author')
+COLUMNS = ('id', 'title', 'description', 'author', 'version', 'created_at', 'updated_at')
+
+# Partial updates for many books in one statement: arrays are unnested into rows,
+# set_* flags tell which fields an update actually carried. Events with a known
+# version only apply to older rows, so redeliveries never regress a book
+BULK_UPDATE_SQL = text("""
+    UPDATE book_read_models AS b SET
+        title = CASE WHEN u.set_title THEN u.title ELSE b.title END,
+        description = CASE WHEN u.set_description THEN u.description ELSE b.description END,
+        author = CASE WHEN u.set_author THEN u.author ELSE b.author END,
+        version = COALESCE(u.version, b.version + u.version_delta),
+        updated_at = COALESCE(u.updated_at, b.updated_at)
+    FROM unnest(
+        CAST(:ids AS uuid[]),
+        CAST(:titles AS text[]), CAST(:set_titles AS boolean[]),
+        CAST(:descriptions AS text[]), CAST(:set_descriptions AS boolean[]),
+        CAST(:authors AS text[]), CAST(:set_authors AS boolean[]),
+        CAST(:versions AS integer[]), CAST(:version_deltas AS integer[]),
+        CAST(:updated_ats AS timestamptz[])
+    ) AS u(id, title, set_title, description, set_description, author, set_author, version, version_delta, updated_at)
+    WHERE b.id = u.id AND (u.version IS NULL OR b.version < u.version)
+    RETURNING b.id, b.title, b.description, b.author, b.version, b.created_at, b.updated_at
+""")
+
+# Prometheus metrics
+projection_apply_duration_seconds = Histogram(
+    'projection_apply_duration_seconds',
+    'Duration of the bulk statement applying one kind of event in a projection batch',
+    ['event_type']
+)
+
+BULK_DELETE_SQL = text("DELETE FROM book_read_models WHERE id = ANY(CAST(:ids AS uuid[])) RETURNING id, version")
+
+SELECT_TOMBSTONES_SQL = text("""
+    SELECT id, version FROM book_read_model_tombstones WHERE id = ANY(CAST(:ids AS uuid[]))
+""")
+
+SELECT_ROWS_SQL = text("""
+    SELECT id, title, description, author, version, created_at, updated_at
+    FROM book_read_models WHERE id = ANY(CAST(:ids AS uuid[]))
+""")
+
+def row_to_dict(row) -> dict:
+    """Result row as a read model dict with a UUID id (raw SQL returns it as text)"""
+    data = dict(row._mapping)
+    data['id'] = uuid.UUID(str(data['id']))
+    return data
+
+def normalize_event_type(event_type: str) -> Optional[str]:
+    """Map the event type spellings of both producers to created/updated/deleted"""
+    return EVENT_TYPES.get(event_type)
+
+def parse_timestamp(value):
+    """Parse ISO timestamp from event payload"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+class BookChange(NamedTuple):
+    """Read model row of a book before and after a batch (None when absent)"""
+    book_id: uuid.UUID
+    before: Optional[dict]
+    after: Optional[dict]
+
+class ProjectionListener:
+    """Derived state kept in step with book_read_models by the projector"""
+    
+    def apply(self, db: Session, changes: List[BookChange]):
+        """Write derived rows inside the projection transaction"""
+    
+    def committed(self, changes: List[BookChange]):
+        """Update in-memory state once the projection transaction committed"""
+    
+    def reset(self):
+        """Reload everything after book_read_models was replaced wholesale"""
+    
+    def position_applied(self, position: int):
+        """A projector worker advanced its event store position"""
+
+class PendingBook:
+    """Net effect of a batch of events on one read model row"""
+    __slots__ = ('row', 'fields', 'updated_at', 'updates', 'version', 'deleted')
+    
+    def __init__(self):
+        self.row = None        # full row when the batch contains the creation
+        self.fields = {}       # partial changes to an already projected row
+        self.updated_at = None
+        self.updates = 0
+        self.version = None    # event version after the batch, when the producer sends one
+        self.deleted = False
+
+class ProjectionBatch:
+    """Collapses events per aggregate in memory and writes them with a few bulk statements"""
+    
+    def __init__(self):
+        self.books: Dict[uuid.UUID, PendingBook] = {}
+        self.events = 0
+    
+    def __len__(self):
+        return self.events
+    
+    def add(self, event_type: str, event_data: dict):
+        """Fold one event into the batch"""
+        kind = normalize_event_type(event_type)
+        if kind is None:
+            print(f"Unknown event type: {event_type}")
+            return
+        
+        book_data = event_data.get('book_data', event_data)
+        book_id = uuid.UUID(str(book_data['id']))
+        pending = self.books.setdefault(book_id, PendingBook())
+        
+        if kind == 'created':
+            if pending.deleted:
+                # Ids are never reused: a creation after the deletion is a redelivery
+                return
+            pending.row = {
+                'id': book_id,
+                'title': book_data['title'],
+                'description': book_data.get('description'),
+                'author': book_data['author'],
+                'version': book_data.get('version', 1),
+                'created_at': parse_timestamp(book_data['created_at']),
+                'updated_at': parse_timestamp(book_data['updated_at'])
+            }
+            pending.deleted = False
+        elif kind == 'updated':
+            if pending.deleted:
+                return
+            changes = {field: book_data[field] for field in UPDATABLE_FIELDS if field in book_data}
+            updated_at = parse_timestamp(book_data['updated_at'])
+            if pending.row is not None:
+                pending.row.update(changes)
+                pending.row['version'] = book_data.get('version', pending.row['version'] + 1)
+                pending.row['updated_at'] = updated_at
+            else:
+                pending.fields.update(changes)
+                pending.updates += 1
+                pending.version = book_data.get('version')
+                pending.updated_at = updated_at
+        else:
+            pending.row = None
+            pending.fields = {}
+            pending.updates = 0
+            pending.version = book_data.get('version')
+            pending.deleted = True
+        
+        self.events += 1
+    
+    def apply(self, db: Session) -> List[BookChange]:
+        """Write the collapsed batch inside the caller's transaction and return the rows it changed"""
+        deleted_ids = [str(book_id) for book_id, pending in self.books.items() if pending.deleted]
+        created_ids = [str(book_id) for book_id, pending in self.books.items() if pending.row is not None]
+        updates = [(book_id, pending) for book_id, pending in self.books.items()
+                   if pending.row is None and not pending.deleted and pending.updates]
+        
+        if not self.books:
+            return []
+        
+        # Rows as they were, so listeners can derive deltas (e.g. the author of a deleted book)
+        before = {}
+        for row in db.execute(SELECT_ROWS_SQL, {'ids': [str(book_id) for book_id in self.books]}):
+            data = row_to_dict(row)
+            before[data['id']] = data
+        after = {}
+        removed = {}
+        
+        if deleted_ids:
+            started = time.time()
+            removed.update(
+                (uuid.UUID(str(row.id)), row.version) for row in db.execute(BULK_DELETE_SQL, {'ids': deleted_ids})
+            )
+            # Remember the deletion so a replayed or redelivered creation cannot bring the book back;
+            # producers without versions get one past the deleted row
+            tombstones = []
+            for book_id in map(uuid.UUID, deleted_ids):
+                version = self.books[book_id].version
+                if version is None:
+                    version = removed[book_id] + 1 if book_id in removed else 1
+                tombstones.append({'id': book_id, 'version': version})
+            statement = pg_insert(BookTombstoneDB).values(tombstones)
+            statement = statement.on_conflict_do_update(
+                index_elements=[BookTombstoneDB.id],
+                set_={'version': func.greatest(BookTombstoneDB.version, statement.excluded.version)}
+            )
+            db.execute(statement)
+            projection_apply_duration_seconds.labels(event_type='deleted').observe(time.time() - started)
+        
+        rows = [pending.row for pending in self.books.values() if pending.row is not None]
+        if created_ids:
+            deleted_at = {uuid.UUID(str(row.id)): row.version
+                          for row in db.execute(SELECT_TOMBSTONES_SQL, {'ids': created_ids})}
+            rows = [row for row in rows if row['version'] > deleted_at.get(row['id'], 0)]
+        
+        if rows:
+            started = time.time()
+            statement = pg_insert(BookReadModelDB).values(rows)
+            statement = statement.on_conflict_do_update(
+                index_elements=[BookReadModelDB.id],
+                set_={
+                    'title': statement.excluded.title,
+                    'description': statement.excluded.description,
+                    'author': statement.excluded.author,
+                    'version': statement.excluded.version,
+                    'updated_at': statement.excluded.updated_at
+                },
+                # A redelivered creation must not overwrite a newer row
+                where=BookReadModelDB.version < statement.excluded.version
+            ).returning(*[getattr(BookReadModelDB, column) for column in COLUMNS])
+            after.update((data['id'], data) for data in map(row_to_dict, db.execute(statement)))
+            projection_apply_duration_seconds.labels(event_type='created').observe(time.time() - started)
+        
+        if updates:
+            started = time.time()
+            result = db.execute(BULK_UPDATE_SQL, {
+                'ids': [str(book_id) for book_id, _ in updates],
+                'titles': [pending.fields.get('title') for _, pending in updates],
+                'set_titles': ['title' in pending.fields for _, pending in updates],
+                'descriptions': [pending.fields.get('description') for _, pending in updates],
+                'set_descriptions': ['description' in pending.fields for _, pending in updates],
+                'authors': [pending.fields.get('author') for _, pending in updates],
+                'set_authors': ['author' in pending.fields for _, pending in updates],
+                'versions': [pending.version for _, pending in updates],
+                'version_deltas': [pending.updates for _, pending in updates],
+                'updated_ats': [pending.updated_at for _, pending in updates]
+            })
+            after.update((data['id'], data) for data in map(row_to_dict, result))
+            projection_apply_duration_seconds.labels(event_type='updated').observe(time.time() - started)
+        
+        changes = [BookChange(book_id, before.get(book_id), None) for book_id in removed]
+        changes.extend(BookChange(book_id, before.get(book_id), row) for book_id, row in after.items())
+        return changes
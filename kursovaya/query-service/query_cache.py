@@ -0,0 +1,138 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Tuple
+
+from projection_batch import BookChange, ProjectionListener
+
+QUERY_CACHE_ENABLED = os.getenv("QUERY_CACHE_ENABLED", "true").lower() == "true"
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+
+# Generation tags: one book, books whose author contains a term, the set of authors, every list
+LIST_TAG = "list"
+AUTHORS_TAG = "authors"
+# Bumped when everything is invalidated at once; part of every snapshot
+EPOCH_TAG = "*"
+
+def book_tag(book_id) -> str:
+    return f"book:{book_id}"
+
+def author_tag(term: str) -> str:
+    return f"author:{term.lower()}"
+
+class QueryCache(ProjectionListener):
+    """LRU cache of query results, invalidated by generation tags the projector bumps"""
+    
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, Tuple[Any, Tuple[Tuple[str, int], ...]]]" = OrderedDict()
+        self.generations: Dict[str, int] = {}
+        # Generations of tags no entry refers to are still needed by in-flight queries; past this
+        # many tags they are forgotten by starting a new epoch instead
+        self.max_generations = self.max_entries * 16
+        # Author terms of cached or running by-author queries, matched against changed authors
+        self.author_terms: Dict[str, int] = {}
+    
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """(True, value) when a current entry exists"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return False, None
+            value, tags = entry
+            if any(self.generations.get(tag, 0) != generation for tag, generation in tags):
+                self._evict(key)
+                return False, None
+            self.entries.move_to_end(key)
+            return True, value
+    
+    def get_or_compute(self, key: Hashable, tags: List[str], compute: Callable[[], Any]) -> Tuple[bool, Any]:
+        """(hit, value) for key, computing and caching the value on a miss"""
+        hit, value = self.get(key)
+        if hit:
+            return True, value
+        
+        # Generations are taken before querying: a change committed meanwhile leaves the entry stale
+        with self.lock:
+            snapshot = tuple((tag, self.generations.get(tag, 0)) for tag in (EPOCH_TAG, *tags))
+            self._retain(snapshot)
+        try:
+            value = compute()
+            with self.lock:
+                if key in self.entries:
+                    self._evict(key)
+                self.entries[key] = (value, snapshot)
+                self._retain(snapshot)
+                while len(self.entries) > self.max_entries:
+                    self._evict(next(iter(self.entries)))
+        finally:
+            with self.lock:
+                self._release(snapshot)
+        return False, value
+    
+    def _retain(self, tags: Tuple[Tuple[str, int], ...]):
+        """Register author terms of an entry or running query (lock held)"""
+        for tag, _ in tags:
+            if tag.startswith("author:"):
+                term = tag[len("author:"):]
+                self.author_terms[term] = self.author_terms.get(term, 0) + 1
+    
+    def _release(self, tags: Tuple[Tuple[str, int], ...]):
+        """Unregister author terms (lock held)"""
+        for tag, _ in tags:
+            if tag.startswith("author:"):
+                term = tag[len("author:"):]
+                remaining = self.author_terms.get(term, 0) - 1
+                if remaining > 0:
+                    self.author_terms[term] = remaining
+                else:
+                    self.author_terms.pop(term, None)
+    
+    def _evict(self, key: Hashable):
+        """Drop an entry (lock held)"""
+        _, tags = self.entries.pop(key)
+        self._release(tags)
+    
+    def _bump(self, tag: str):
+        """Invalidate every entry depending on tag (lock held)"""
+        self.generations[tag] = self.generations.get(tag, 0) + 1
+    
+    def committed(self, changes: List[BookChange]):
+        """Bump the tags of everything a projection batch changed"""
+        if not changes:
+            return
+        
+        with self.lock:
+            self._bump(LIST_TAG)
+            authors = set()
+            for change in changes:
+                self._bump(book_tag(change.book_id))
+                before = change.before['author'] if change.before else None
+                after = change.after['author'] if change.after else None
+                if before != after:
+                    self._bump(AUTHORS_TAG)
+                authors.update(author.lower() for author in (before, after) if author)
+            
+            # by-author matches substrings, so every cached term contained in a changed author is affected
+            for term in list(self.author_terms):
+                if any(term in author for author in authors):
+                    self._bump(author_tag(term))
+            
+            if len(self.generations) > self.max_generations:
+                self._new_epoch()
+    
+    def _new_epoch(self):
+        """Invalidate all entries and forget tag generations (lock held)"""
+        epoch = self.generations.get(EPOCH_TAG, 0) + 1
+        for key in list(self.entries):
+            self._evict(key)
+        self.generations = {EPOCH_TAG: epoch}
+    
+    def reset(self):
+        """Drop everything after the read model was replaced"""
+        with self.lock:
+            self._new_epoch()
+    
+    def __len__(self):
+        return len(self.entries)
@@ -0,0 +1,261 @@
+import csv
+import io
+import multiprocessing
+import os
+import re
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from typing import Optional
+
+import psycopg2
+from prometheus_client import Counter, Gauge
+
+from database import DATABASE_URL
+from partitioning import partition_sql
+
+REBUILD_WORKERS = int(os.getenv("REBUILD_WORKERS", str(os.cpu_count() or 2)))
+# More shards than workers keeps the pool busy and makes progress reporting finer
+REBUILD_SHARDS_PER_WORKER = int(os.getenv("REBUILD_SHARDS_PER_WORKER", "4"))
+REBUILD_COPY_BATCH = int(os.getenv("REBUILD_COPY_BATCH", "10000"))
+
+SHADOW_TABLE = "book_read_models_rebuild"
+OLD_TABLE = "book_read_models_old"
+COLUMNS = ("id", "title", "description", "author", "version", "created_at", "updated_at")
+
+# Prometheus metrics
+rebuild_progress_ratio = Gauge(
+    'read_model_rebuild_progress_ratio',
+    'Share of shards finished by the running read model rebuild'
+)
+
+rebuild_events_total = Counter(
+    'read_model_rebuild_events_total',
+    'Total number of events folded by read model rebuilds'
+)
+
+rebuild_events_per_second = Gauge(
+    'read_model_rebuild_events_per_second',
+    'Throughput of the last read model rebuild'
+)
+
+def parse_timestamp(value):
+    """Parse ISO timestamp from event payload"""
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return value
+
+def fold_event(row: Optional[dict], aggregate_id, event_type: str, event_data: dict, event_version: int) -> Optional[dict]:
+    """Apply one event store event to an in-memory read model row"""
+    if event_type == 'book_created':
+        created_at = parse_timestamp(event_data['created_at'])
+        return {
+            'id': aggregate_id,
+            'title': event_data['title'],
+            'description': event_data.get('description'),
+            'author': event_data['author'],
+            'version': event_version,
+            'created_at': created_at,
+            'updated_at': created_at
+        }
+    if event_type == 'book_updated' and row is not None:
+        for field in ('title', 'description', 'author'):
+            if field in event_data:
+                row[field] = event_data[field]
+        row['version'] = event_version
+        row['updated_at'] = parse_timestamp(event_data['updated_at'])
+        return row
+    if event_type == 'book_deleted':
+        return None
+    return row
+
+def rebuild_shard(shard: int, shards: int, head: int) -> tuple:
+    """Fold one shard of the event store and COPY its rows into the shadow table (runs in a worker process)"""
+    connection = psycopg2.connect(DATABASE_URL)
+    events = 0
+    books = 0
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        
+        def flush():
+            buffer.seek(0)
+            with connection.cursor() as copy_cursor:
+                copy_cursor.copy_expert(
+                    f"COPY {SHADOW_TABLE} ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer
+                )
+            buffer.seek(0)
+            buffer.truncate()
+        
+        def write(row):
+            writer.writerow(['\\N' if row[column] is None else row[column] for column in COLUMNS])
+        
+        # Named cursor = server-side cursor; rows arrive in itersize chunks
+        with connection.cursor(name=f"rebuild_shard_{shard}") as cursor:
+            cursor.itersize = REBUILD_COPY_BATCH
+            cursor.execute(
+                f"""
+                SELECT aggregate_id, event_type, event_data, event_version
+                FROM event_store
+                WHERE id <= %s AND {partition_sql('aggregate_id', shards)} = %s
+                ORDER BY aggregate_id, event_version
+                """,
+                (head, shard)
+            )
+            
+            current_id = None
+            row = None
+            pending = 0
+            for aggregate_id, event_type, event_data, event_version in cursor:
+                if aggregate_id != current_id:
+                    if row is not None:
+                        write(row)
+                        books += 1
+                        pending += 1
+                    current_id = aggregate_id
+                    row = None
+                    if pending >= REBUILD_COPY_BATCH:
+                        flush()
+                        pending = 0
+                
+                row = fold_event(row, aggregate_id, event_type, event_data, event_version)
+                events += 1
+            
+            if row is not None:
+                write(row)
+                books += 1
+        
+        flush()
+        connection.commit()
+    finally:
+        connection.close()
+    
+    return shard, events, books
+
+class ReadModelRebuilder:
+    """Rebuilds book_read_models from event_store into a shadow table and swaps it in"""
+    
+    def __init__(self, projector=None, workers: int = REBUILD_WORKERS):
+        self.projector = projector
+        self.workers = max(1, workers)
+        self.lock = threading.Lock()
+        self.status = {"state": "idle"}
+    
+    def start(self) -> bool:
+        """Run rebuild in a background thread; False if one is already running"""
+        with self.lock:
+            if self.status.get("state") == "running":
+                return False
+            self.status = {"state": "running", "started_at": datetime.utcnow().isoformat()}
+        
+        threading.Thread(target=self.run, daemon=True).start()
+        return True
+    
+    def run(self):
+        """Rebuild, recording the outcome in status"""
+        try:
+            self.rebuild()
+        except Exception as e:
+            print(f"Read model rebuild failed: {e}")
+            self.status.update(state="failed", error=str(e))
+    
+    def rebuild(self):
+        """Shard, fold and bulk-load all aggregates, then swap the tables atomically"""
+        started = time.time()
+        shards = self.workers * REBUILD_SHARDS_PER_WORKER
+        
+        connection = psycopg2.connect(DATABASE_URL)
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM event_store")
+                head = cursor.fetchone()[0]
+                cursor.execute(f"DROP TABLE IF EXISTS {SHADOW_TABLE}")
+                cursor.execute(f"CREATE TABLE {SHADOW_TABLE} (LIKE book_read_models INCLUDING DEFAULTS)")
+            connection.commit()
+            
+            self.status.update(head=head, shards=shards, shards_done=0, events=0, books=0)
+            rebuild_progress_ratio.set(0)
+            
+            # Spawned (not forked) workers: this process runs pika and listener threads
+            context = multiprocessing.get_context("spawn")
+            with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+                futures = [pool.submit(rebuild_shard, shard, shards, head) for shard in range(shards)]
+                for future in as_completed(futures):
+                    _, events, books = future.result()
+                    elapsed = max(time.time() - started, 1e-6)
+                    self.status["shards_done"] += 1
+                    self.status["events"] += events
+                    self.status["books"] += books
+                    self.status["events_per_second"] = round(self.status["events"] / elapsed, 1)
+                    rebuild_events_total.inc(events)
+                    rebuild_progress_ratio.set(self.status["shards_done"] / shards)
+                    rebuild_events_per_second.set(self.status["events_per_second"])
+            
+            self.status["state_detail"] = "indexing"
+            indexes = self._build_indexes(connection)
+            
+            self.status["state_detail"] = "swapping"
+            if self.projector is not None:
+                # Hold projection in every partition while swapping, then resume from the rebuild position
+                with self.projector.paused():
+                    self._swap(connection, indexes, head, self.projector.checkpoint_names())
+                    self.projector.reset_position(head)
+                    self.projector.reset_listeners()
+                    self.projector.notify_position_applied()
+                self.projector.notify_position()
+            else:
+                self._swap(connection, indexes, head, ["book_read_models"])
+        finally:
+            connection.close()
+        
+        duration = time.time() - started
+        self.status.update(state="completed", duration_seconds=round(duration, 2))
+        self.status.pop("state_detail", None)
+        print(f"Read model rebuild finished: {self.status['books']} books from {self.status['events']} events in {duration:.2f}s")
+    
+    def _build_indexes(self, connection) -> list:
+        """Create primary key and copies of the live table's indexes on the shadow table"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {SHADOW_TABLE} ADD CONSTRAINT {SHADOW_TABLE}_pkey PRIMARY KEY (id)")
+            cursor.execute(
+                "SELECT indexname, indexdef FROM pg_indexes "
+                "WHERE tablename = 'book_read_models' AND indexname <> 'book_read_models_pkey'"
+            )
+            indexes = cursor.fetchall()
+            for name, definition in indexes:
+                definition = definition.replace(f"INDEX {name} ON", f"INDEX {name}_rebuild ON", 1)
+                definition = re.sub(r" ON (\S+\.)?book_read_models ", f" ON \\g<1>{SHADOW_TABLE} ", definition, count=1)
+                cursor.execute(definition)
+        connection.commit()
+        return [name for name, _ in indexes]
+    
+    def _swap(self, connection, indexes: list, head: int, checkpoint_names: list):
+        """Replace the live table with the shadow table in one transaction"""
+        with connection.cursor() as cursor:
+            cursor.execute("LOCK TABLE book_read_models IN ACCESS EXCLUSIVE MODE")
+            # Books written by api-service have no event stream; carry them over as they are
+            cursor.execute(
+                f"""
+                INSERT INTO {SHADOW_TABLE} ({', '.join(COLUMNS)})
+                SELECT {', '.join(COLUMNS)} FROM book_read_models b
+                WHERE NOT EXISTS (SELECT 1 FROM event_store e WHERE e.aggregate_id = b.id)
+                ON CONFLICT (id) DO NOTHING
+                """
+            )
+            cursor.execute(f"ALTER TABLE book_read_models RENAME TO {OLD_TABLE}")
+            cursor.execute(f"ALTER TABLE {SHADOW_TABLE} RENAME TO book_read_models")
+            cursor.execute(f"DROP TABLE {OLD_TABLE}")
+            cursor.execute(f"ALTER TABLE book_read_models RENAME CONSTRAINT {SHADOW_TABLE}_pkey TO book_read_models_pkey")
+            for name in indexes:
+                cursor.execute(f"ALTER INDEX {name}_rebuild RENAME TO {name}")
+            for name in checkpoint_names:
+                cursor.execute(
+                    """
+                    INSERT INTO projection_checkpoints (name, position, updated_at)
+                    VALUES (%s, %s, now())
+                    ON CONFLICT (name) DO UPDATE SET position = EXCLUDED.position, updated_at = now()
+                    """,
+                    (name, head)
+                )
+        connection.commit()
@@ -0,0 +1,166 @@
+import bisect
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from prometheus_client import Gauge
+
+from database import get_db, BookReadModelDB
+from projection_batch import BookChange, ProjectionListener
+
+# Serve id lookups, authors and recent books from memory instead of Postgres
+READ_MODEL_REPLICA_ENABLED = os.getenv("READ_MODEL_REPLICA_ENABLED", "false").lower() == "true"
+
+# Prometheus metrics
+replica_books = Gauge(
+    'read_model_replica_books',
+    'Number of books held in the in-memory read model replica'
+)
+
+def utc_naive(value: Optional[datetime]) -> Optional[datetime]:
+    """Timestamps are compared as naive UTC, as stored in book_read_models"""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+class ReplicaRow:
+    """One read model row; slots keep it far smaller than an ORM object"""
+    __slots__ = ('id', 'title', 'description', 'author', 'version', 'created_at', 'updated_at')
+    
+    def __init__(self, id, title, description, author, version, created_at, updated_at):
+        self.id = id
+        self.title = title
+        self.description = description
+        self.author = author
+        self.version = version
+        self.created_at = created_at
+        self.updated_at = updated_at
+
+class ReadModelReplica(ProjectionListener):
+    """Memory-resident copy of book_read_models kept current by the projector"""
+    
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ready = False
+        self._clear()
+    
+    def _clear(self):
+        """Empty structures (lock held or not yet shared)"""
+        self.rows: List[Optional[ReplicaRow]] = []
+        self.slots: Dict[uuid.UUID, int] = {}
+        self.free_slots: List[int] = []
+        # Interned author strings with the number of books referencing each
+        self.authors: Dict[str, int] = {}
+        self.author_strings: Dict[str, str] = {}
+        # (created_at, slot) in ascending order for recent books
+        self.by_created: List[tuple] = []
+    
+    def load(self, batch_size: int = 10000):
+        """Copy book_read_models into memory"""
+        started = time.time()
+        with self.lock:
+            self.ready = False
+            self._clear()
+            with next(get_db()) as db:
+                query = db.query(
+                    BookReadModelDB.id, BookReadModelDB.title, BookReadModelDB.description, BookReadModelDB.author,
+                    BookReadModelDB.version, BookReadModelDB.created_at, BookReadModelDB.updated_at
+                ).execution_options(yield_per=batch_size)
+                for row in query:
+                    self._put(row._asdict())
+            self.ready = True
+        
+        replica_books.set(len(self.slots))
+        print(f"Read model replica loaded {len(self.slots)} books in {time.time() - started:.2f}s")
+    
+    def _intern_author(self, author: str) -> str:
+        """Shared string instance for an author (lock held)"""
+        interned = self.author_strings.setdefault(author, author)
+        self.authors[interned] = self.authors.get(interned, 0) + 1
+        return interned
+    
+    def _release_author(self, author: str):
+        """Drop one reference to an author (lock held)"""
+        remaining = self.authors.get(author, 0) - 1
+        if remaining > 0:
+            self.authors[author] = remaining
+        else:
+            self.authors.pop(author, None)
+            self.author_strings.pop(author, None)
+    
+    def _put(self, data: dict):
+        """Insert or replace a row (lock held)"""
+        self._delete(data['id'])
+        
+        row = ReplicaRow(
+            id=data['id'],
+            title=data['title'],
+            description=data.get('description'),
+            author=self._intern_author(data['author']),
+            version=data['version'],
+            created_at=utc_naive(data['created_at']),
+            updated_at=utc_naive(data['updated_at'])
+        )
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.rows[slot] = row
+        else:
+            slot = len(self.rows)
+            self.rows.append(row)
+        self.slots[row.id] = slot
+        if row.created_at is not None:
+            bisect.insort(self.by_created, (row.created_at, slot))
+    
+    def _delete(self, book_id: uuid.UUID):
+        """Remove a row if present (lock held)"""
+        slot = self.slots.pop(book_id, None)
+        if slot is None:
+            return
+        
+        row = self.rows[slot]
+        if row.created_at is not None:
+            position = bisect.bisect_left(self.by_created, (row.created_at, slot))
+            if position < len(self.by_created) and self.by_created[position] == (row.created_at, slot):
+                del self.by_created[position]
+        self._release_author(row.author)
+        self.rows[slot] = None
+        self.free_slots.append(slot)
+    
+    def committed(self, changes: List[BookChange]):
+        """Apply committed read model changes"""
+        with self.lock:
+            for change in changes:
+                if change.after is None:
+                    self._delete(change.book_id)
+                else:
+                    self._put(change.after)
+        replica_books.set(len(self.slots))
+    
+    def reset(self):
+        """Reload after the read model was replaced"""
+        self.load()
+    
+    def get(self, book_id: uuid.UUID) -> Optional[ReplicaRow]:
+        """Row by id"""
+        with self.lock:
+            slot = self.slots.get(book_id)
+            return self.rows[slot] if slot is not None else None
+    
+    def list_authors(self) -> List[str]:
+        """Distinct authors"""
+        with self.lock:
+            return list(self.authors)
+    
+    def recent(self, since: datetime, limit: int) -> List[ReplicaRow]:
+        """Books created at or after since, newest first"""
+        since = utc_naive(since)
+        with self.lock:
+            books = []
+            for created_at, slot in reversed(self.by_created):
+                if created_at < since or len(books) >= limit:
+                    break
+                books.append(self.rows[slot])
+            return books
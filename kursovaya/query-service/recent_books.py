@@ -0,0 +1,143 @@
+import bisect
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from prometheus_client import Gauge
+from sqlalchemy import desc
+
+from database import get_db, BookReadModelDB
+from projection_batch import BookChange, ProjectionListener
+from read_model_replica import ReplicaRow, utc_naive
+
+RECENT_BOOKS_ENABLED = os.getenv("RECENT_BOOKS_ENABLED", "true").lower() == "true"
+# Newest creations held in memory; older ones are answered by the created_at index
+RECENT_BOOKS_CAPACITY = int(os.getenv("RECENT_BOOKS_CAPACITY", "10000"))
+# Matches the longest /books/recent window
+RECENT_BOOKS_RETENTION_HOURS = int(os.getenv("RECENT_BOOKS_RETENTION_HOURS", "168"))
+
+# Prometheus metrics
+recent_books_buffered = Gauge(
+    'recent_books_buffered',
+    'Number of recently created books held in memory'
+)
+
+class RecentBooks(ProjectionListener):
+    """Bounded, creation-ordered buffer of the newest books, kept current by the projector"""
+    
+    def __init__(self, capacity: int = RECENT_BOOKS_CAPACITY, retention_hours: int = RECENT_BOOKS_RETENTION_HOURS):
+        self.capacity = max(1, capacity)
+        self.retention = timedelta(hours=retention_hours)
+        self.lock = threading.Lock()
+        self.ready = False
+        self._clear()
+    
+    def _clear(self):
+        """Empty structures (lock held or not yet shared)"""
+        # (created_at, id) ascending, rows by id; every book created after floor is held
+        self.keys: List[tuple] = []
+        self.rows: Dict[uuid.UUID, ReplicaRow] = {}
+        self.floor = datetime.utcnow() - self.retention
+    
+    def load(self):
+        """Seed from the newest rows of book_read_models (created_at index, no scan)"""
+        started = time.time()
+        with self.lock:
+            self.ready = False
+            self._clear()
+            with next(get_db()) as db:
+                books = db.query(BookReadModelDB).filter(
+                    BookReadModelDB.created_at >= self.floor
+                ).order_by(
+                    desc(BookReadModelDB.created_at), desc(BookReadModelDB.id)
+                ).limit(self.capacity).all()
+            
+            for book in books:
+                self._put({column: getattr(book, column) for column in ReplicaRow.__slots__})
+            if len(books) == self.capacity:
+                # Older books in the window may exist; only times after the oldest loaded are complete
+                self.floor = self.keys[0][0]
+            self.ready = True
+        
+        recent_books_buffered.set(len(self.rows))
+        print(f"Recent books loaded {len(books)} books in {time.time() - started:.2f}s")
+    
+    def _put(self, data: dict):
+        """Insert or replace a row if it was created after floor (lock held)"""
+        self._delete(data['id'])
+        created_at = utc_naive(data['created_at'])
+        if created_at is None or created_at <= self.floor:
+            return
+        
+        self.rows[data['id']] = ReplicaRow(
+            id=data['id'],
+            title=data['title'],
+            description=data.get('description'),
+            author=data['author'],
+            version=data['version'],
+            created_at=created_at,
+            updated_at=utc_naive(data['updated_at'])
+        )
+        # Creations arrive almost in time order, so this is nearly always an append
+        bisect.insort(self.keys, (created_at, data['id']))
+    
+    def _delete(self, book_id: uuid.UUID):
+        """Remove a row if present (lock held)"""
+        row = self.rows.pop(book_id, None)
+        if row is not None:
+            del self.keys[bisect.bisect_left(self.keys, (row.created_at, book_id))]
+    
+    def _trim(self):
+        """Drop rows past the retention window or over capacity, raising floor (lock held)"""
+        cutoff = datetime.utcnow() - self.retention
+        expired = bisect.bisect_left(self.keys, (cutoff,))
+        # Trimmed in chunks so the list is not shifted on every insert
+        overflow = len(self.keys) - self.capacity
+        if overflow > self.capacity // 8:
+            expired = max(expired, overflow)
+        
+        if expired:
+            self.floor = max(self.floor, self.keys[expired - 1][0])
+            for _, book_id in self.keys[:expired]:
+                del self.rows[book_id]
+            del self.keys[:expired]
+        self.floor = max(self.floor, cutoff)
+    
+    def committed(self, changes: List[BookChange]):
+        """Apply committed read model changes"""
+        with self.lock:
+            for change in changes:
+                if change.after is None:
+                    self._delete(change.book_id)
+                else:
+                    self._put(change.after)
+            self._trim()
+        recent_books_buffered.set(len(self.rows))
+    
+    def reset(self):
+        """Reload after the read model was replaced"""
+        self.load()
+    
+    def recent(self, since: datetime, limit: int) -> Optional[List[ReplicaRow]]:
+        """Books created at or after since, newest first; None when the database has to answer"""
+        since = utc_naive(since)
+        with self.lock:
+            if not self.ready:
+                return None
+            start = bisect.bisect_left(self.keys, (since,))
+            books = [self.rows[book_id] for _, book_id in reversed(self.keys[max(start, len(self.keys) - limit):])]
+            # Complete if the window lies after floor, or the newest `limit` books all do
+            if since > self.floor or (len(books) == limit and books[-1].created_at > self.floor):
+                return books
+            return None
+    
+    def count(self, since: datetime) -> Optional[int]:
+        """Number of books created at or after since, or None when older than the buffer"""
+        since = utc_naive(since)
+        with self.lock:
+            if not self.ready or since <= self.floor:
+                return None
+            return len(self.keys) - bisect.bisect_left(self.keys, (since,))
@@ -0,0 +1,261 @@
+import bisect
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Dict, List, NamedTuple, Optional, Set
+
+from prometheus_client import Gauge
+
+from database import get_db, BookReadModelDB
+from projection_batch import BookChange, ProjectionListener
+
+SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "true").lower() == "true"
+# Above this many candidates the index gives up and the database scans instead
+SEARCH_INDEX_MAX_CANDIDATES = int(os.getenv("SEARCH_INDEX_MAX_CANDIDATES", "10000"))
+
+GRAM_SIZE = 3
+TOKEN_PATTERN = re.compile(r"\w+")
+# ILIKE wildcards typed by the user cannot be answered from n-grams
+WILDCARDS = ('%', '_')
+
+# Prometheus metrics
+search_index_documents = Gauge(
+    'search_index_documents',
+    'Number of books held in the in-memory search index'
+)
+
+def normalize(text: Optional[str]) -> str:
+    """Case folding used both for indexing and for queries (same as ILIKE)"""
+    return (text or '').lower()
+
+def ngrams(text: str) -> Set[str]:
+    """Overlapping character n-grams of normalized text"""
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+def tokens(text: str) -> List[str]:
+    """Words of normalized text"""
+    return TOKEN_PATTERN.findall(text)
+
+class SearchMatch(NamedTuple):
+    """Books matching every term, verified against the indexed texts"""
+    book_ids: List[uuid.UUID]
+
+class FieldIndex:
+    """Inverted n-gram and word indexes of one text field"""
+    
+    def __init__(self):
+        self.grams: Dict[str, Set[int]] = {}
+        self.words: Dict[str, Set[int]] = {}
+        self.vocabulary: List[str] = []  # sorted words, for prefix lookups
+        # Indexed text per slot: verifies candidates and tells remove() exactly what to unindex
+        self.texts: Dict[int, str] = {}
+    
+    def add(self, slot: int, text: str, sort_vocabulary: bool = True):
+        """Index a document's field; bulk loads defer sorting the vocabulary to sort_vocabulary()"""
+        for gram in ngrams(text):
+            self.grams.setdefault(gram, set()).add(slot)
+        for word in set(tokens(text)):
+            postings = self.words.get(word)
+            if postings is None:
+                postings = self.words[word] = set()
+                if sort_vocabulary:
+                    bisect.insort(self.vocabulary, word)
+                else:
+                    self.vocabulary.append(word)
+            postings.add(slot)
+        self.texts[slot] = text
+    
+    def sort_vocabulary(self):
+        """Restore vocabulary order after a bulk load"""
+        self.vocabulary.sort()
+    
+    def remove(self, slot: int):
+        """Drop a document's field from the index"""
+        text = self.texts.pop(slot, None)
+        if text is None:
+            return
+        for gram in ngrams(text):
+            postings = self.grams.get(gram)
+            if postings is not None:
+                postings.discard(slot)
+                if not postings:
+                    del self.grams[gram]
+        for word in set(tokens(text)):
+            postings = self.words.get(word)
+            if postings is not None:
+                postings.discard(slot)
+                if not postings:
+                    del self.words[word]
+                    del self.vocabulary[bisect.bisect_left(self.vocabulary, word)]
+    
+    def contains(self, term: str) -> Optional[Set[int]]:
+        """Documents whose field contains term; None if term is too short"""
+        grams = ngrams(term)
+        if not grams:
+            return None
+        
+        # Intersect smallest posting lists first
+        postings = sorted((self.grams.get(gram, set()) for gram in grams), key=len)
+        slots = set(postings[0])
+        for posting in postings[1:]:
+            slots &= posting
+            if not slots:
+                break
+        
+        return {slot for slot in slots if term in self.texts[slot]}
+    
+    def prefix(self, term: str) -> Set[int]:
+        """Documents having all words of term, the last one possibly incomplete"""
+        words = tokens(term)
+        if not words:
+            return set()
+        
+        *complete, partial = words
+        slots = set()
+        start = bisect.bisect_left(self.vocabulary, partial)
+        for word in self.vocabulary[start:]:
+            if not word.startswith(partial):
+                break
+            slots |= self.words[word]
+        
+        for word in complete:
+            slots &= self.words.get(word, set())
+        return slots
+
+class SearchIndex(ProjectionListener):
+    """In-memory inverted index of book titles, authors and descriptions"""
+    
+    FIELDS = ('title', 'author', 'description')
+    
+    def __init__(self, max_candidates: int = SEARCH_INDEX_MAX_CANDIDATES):
+        self.max_candidates = max_candidates
+        self.lock = threading.RLock()
+        self.ready = False
+        self._clear()
+    
+    def _clear(self):
+        """Empty structures (lock held or not yet shared)"""
+        self.fields = {field: FieldIndex() for field in self.FIELDS}
+        self.slots: Dict[uuid.UUID, int] = {}
+        self.ids: List[Optional[uuid.UUID]] = []
+        self.free_slots: List[int] = []
+    
+    def load(self, batch_size: int = 10000):
+        """Build the index from book_read_models"""
+        started = time.time()
+        with self.lock:
+            self.ready = False
+            self._clear()
+            with next(get_db()) as db:
+                query = db.query(
+                    BookReadModelDB.id, BookReadModelDB.title, BookReadModelDB.author, BookReadModelDB.description
+                ).execution_options(yield_per=batch_size)
+                for row in query:
+                    self._add(row._asdict(), sort_vocabulary=False)
+            # One sort instead of an insort per new word
+            for index in self.fields.values():
+                index.sort_vocabulary()
+            self.ready = True
+        
+        search_index_documents.set(len(self.slots))
+        print(f"Search index built with {len(self.slots)} books in {time.time() - started:.2f}s")
+    
+    def _add(self, row: dict, sort_vocabulary: bool = True):
+        """Index a read model row, replacing the book's previous entry (lock held)"""
+        book_id = row['id']
+        if book_id in self.slots:
+            self._remove(book_id)
+        
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.ids[slot] = book_id
+        else:
+            slot = len(self.ids)
+            self.ids.append(book_id)
+        self.slots[book_id] = slot
+        
+        for field in self.FIELDS:
+            self.fields[field].add(slot, normalize(row.get(field)), sort_vocabulary)
+    
+    def _remove(self, book_id: uuid.UUID):
+        """Unindex a book (lock held)"""
+        slot = self.slots.pop(book_id, None)
+        if slot is None:
+            return
+        
+        for index in self.fields.values():
+            index.remove(slot)
+        self.ids[slot] = None
+        self.free_slots.append(slot)
+    
+    def committed(self, changes: List[BookChange]):
+        """Reindex books changed by a projection batch"""
+        with self.lock:
+            for change in changes:
+                if change.after is None:
+                    self._remove(change.book_id)
+                else:
+                    self._add(change.after)
+        search_index_documents.set(len(self.slots))
+    
+    def reset(self):
+        """Rebuild after the read model was replaced"""
+        self.load()
+    
+    def match(self, terms: Dict[str, Optional[str]], mode: str = "contains") -> Optional[SearchMatch]:
+        """Books matching every given field term, or None when the database has to answer"""
+        terms = {field: normalize(term) for field, term in terms.items() if term}
+        if not self.ready or not terms:
+            return None
+        if mode == "contains" and any(wildcard in term for term in terms.values() for wildcard in WILDCARDS):
+            return None
+        
+        with self.lock:
+            slots = None
+            for field, term in terms.items():
+                index = self.fields[field]
+                if mode == "prefix":
+                    found = index.prefix(term)
+                else:
+                    found = index.contains(term)
+                    if found is None:
+                        return None
+                slots = found if slots is None else slots & found
+                if not slots:
+                    break
+            
+            if len(slots) > self.max_candidates:
+                return None
+            book_ids = [self.ids[slot] for slot in slots]
+        
+        return SearchMatch(book_ids=book_ids)
+    
+    def rank(self, book_ids: List[uuid.UUID], terms: Dict[str, Optional[str]]) -> List[uuid.UUID]:
+        """Order books by how well title and author match: exact, starts with, word prefix, substring"""
+        terms = {field: normalize(term) for field, term in terms.items() if term and field in ('title', 'author')}
+        
+        def score(book_id):
+            slot = self.slots.get(book_id)
+            if slot is None:
+                return 0
+            total = 0
+            for field, term in terms.items():
+                text = self.fields[field].texts.get(slot, '')
+                if text == term:
+                    total += 4
+                elif text.startswith(term):
+                    total += 3
+                elif any(word.startswith(term) for word in tokens(text)):
+                    total += 2
+                elif term in text:
+                    total += 1
+            return total
+        
+        with self.lock:
+            scored = [(score(book_id), self.fields['title'].texts.get(self.slots.get(book_id), ''), str(book_id), book_id)
+                      for book_id in book_ids]
+        
+        scored.sort(key=lambda item: (-item[0], item[1], item[2]))
+        return [book_id for *_, book_id in scored]
@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from database import get_db, BookStatisticDB
+from projection_batch import BookChange, ProjectionListener
+
+# Recent creations are counted per time bucket; /statistics may overcount by up to one bucket
+STATISTICS_BUCKET_MINUTES = int(os.getenv("STATISTICS_BUCKET_MINUTES", "5"))
+# Buckets older than this are pruned (matches the longest /books/recent window)
+STATISTICS_RETENTION_HOURS = int(os.getenv("STATISTICS_RETENTION_HOURS", "168"))
+
+BUCKET_FORMAT = "%Y-%m-%dT%H:%M"
+EPOCH = datetime(1970, 1, 1)
+
+# Recount everything from the read model (first start or after a rebuild)
+SEED_SQL = text("""
+    INSERT INTO book_statistics (kind, key, count)
+    SELECT 'author', author, COUNT(*) FROM book_read_models GROUP BY author
+    UNION ALL
+    SELECT 'created', to_char(
+        to_timestamp(floor(extract(epoch FROM created_at) / :bucket_seconds) * :bucket_seconds) AT TIME ZONE 'UTC',
+        'YYYY-MM-DD"T"HH24:MI'
+    ), COUNT(*)
+    FROM book_read_models
+    WHERE created_at >= (now() AT TIME ZONE 'UTC') - make_interval(hours => :retention_hours)
+    GROUP BY 2
+""")
+
+def bucket_start(value: datetime) -> datetime:
+    """Start of the time bucket a naive or UTC-aware timestamp falls into"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    bucket_seconds = STATISTICS_BUCKET_MINUTES * 60
+    seconds = int((value - EPOCH).total_seconds()) // bucket_seconds * bucket_seconds
+    return EPOCH + timedelta(seconds=seconds)
+
+def change_deltas(changes: List[BookChange]) -> Counter:
+    """Net effect of read model changes on (kind, key) counters"""
+    deltas = Counter()
+    for change in changes:
+        for row, sign in ((change.before, -1), (change.after, 1)):
+            if row is None:
+                continue
+            deltas[('author', row['author'])] += sign
+            if row.get('created_at') is not None:
+                deltas[('created', bucket_start(row['created_at']).strftime(BUCKET_FORMAT))] += sign
+    
+    # Updates that kept author and creation time cancel out
+    return Counter({key: delta for key, delta in deltas.items() if delta})
+
+class StatisticsProjection(ProjectionListener):
+    """Book counters kept in book_statistics by the projector, mirrored in memory for O(1) reads"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.total = 0
+        self.authors: Dict[str, int] = {}
+        self.created: Dict[datetime, int] = {}
+        self.top_author: Optional[str] = None
+        self.top_author_stale = True
+    
+    def load(self):
+        """Load counters from book_statistics, seeding the table on first start"""
+        with next(get_db()) as db:
+            # Every book has an author row, so an empty table means never seeded (or no books, cheap to seed)
+            seeded = db.query(BookStatisticDB.kind).first()
+            if seeded is None:
+                self._seed(db)
+                db.commit()
+            rows = db.query(BookStatisticDB.kind, BookStatisticDB.key, BookStatisticDB.count).all()
+        
+        with self.lock:
+            self.total = 0
+            self.authors = {}
+            self.created = {}
+            for kind, key, count in rows:
+                if kind == 'author':
+                    self.authors[key] = count
+                    self.total += count
+                elif kind == 'created':
+                    self.created[datetime.strptime(key, BUCKET_FORMAT)] = count
+            self.top_author_stale = True
+        print(f"Statistics loaded: {self.total} books by {len(self.authors)} authors")
+    
+    def _seed(self, db: Session):
+        """Recount book_statistics from book_read_models"""
+        db.execute(text("DELETE FROM book_statistics"))
+        db.execute(SEED_SQL, {
+            'bucket_seconds': STATISTICS_BUCKET_MINUTES * 60,
+            'retention_hours': STATISTICS_RETENTION_HOURS
+        })
+    
+    def apply(self, db: Session, changes: List[BookChange]):
+        """Add the batch's deltas to book_statistics in the projection transaction"""
+        deltas = change_deltas(changes)
+        if not deltas:
+            return
+        
+        # Sorted keys: workers lock shared counter rows in the same order and cannot deadlock
+        rows = [{'kind': kind, 'key': key, 'count': delta} for (kind, key), delta in sorted(deltas.items())]
+        statement = pg_insert(BookStatisticDB).values(rows)
+        statement = statement.on_conflict_do_update(
+            index_elements=[BookStatisticDB.kind, BookStatisticDB.key],
+            set_={'count': BookStatisticDB.count + statement.excluded.count}
+        ).returning(BookStatisticDB.kind, BookStatisticDB.key, BookStatisticDB.count)
+        emptied = [(kind, key) for kind, key, count in db.execute(statement) if count <= 0]
+        
+        for kind, key in emptied:
+            db.query(BookStatisticDB).filter(
+                BookStatisticDB.kind == kind, BookStatisticDB.key == key, BookStatisticDB.count <= 0
+            ).delete(synchronize_session=False)
+        
+        if any(kind == 'created' for kind, _ in deltas):
+            cutoff = bucket_start(datetime.utcnow() - timedelta(hours=STATISTICS_RETENTION_HOURS))
+            db.query(BookStatisticDB).filter(
+                BookStatisticDB.kind == 'created', BookStatisticDB.key < cutoff.strftime(BUCKET_FORMAT)
+            ).delete(synchronize_session=False)
+    
+    def committed(self, changes: List[BookChange]):
+        """Apply the same deltas to the in-memory mirror"""
+        deltas = change_deltas(changes)
+        if not deltas:
+            return
+        
+        cutoff = bucket_start(datetime.utcnow() - timedelta(hours=STATISTICS_RETENTION_HOURS))
+        with self.lock:
+            for (kind, key), delta in deltas.items():
+                if kind == 'author':
+                    # The total is the sum of author counts: no single row every worker has to lock
+                    self.total += delta
+                    count = self.authors.get(key, 0) + delta
+                    if count > 0:
+                        self.authors[key] = count
+                    else:
+                        self.authors.pop(key, None)
+                    self._track_top_author(key, count, delta)
+                else:
+                    bucket = datetime.strptime(key, BUCKET_FORMAT)
+                    count = self.created.get(bucket, 0) + delta
+                    if count > 0 and bucket >= cutoff:
+                        self.created[bucket] = count
+                    else:
+                        self.created.pop(bucket, None)
+            
+            for bucket in [bucket for bucket in self.created if bucket < cutoff]:
+                del self.created[bucket]
+    
+    def _track_top_author(self, author: str, count: int, delta: int):
+        """Keep the most popular author current without rescanning on every change (lock held)"""
+        if self.top_author_stale:
+            return
+        if delta < 0 and author == self.top_author:
+            # The leader lost books; someone else may lead now
+            self.top_author_stale = True
+        elif delta > 0 and (self.top_author is None or count > self.authors.get(self.top_author, 0)):
+            self.top_author = author
+    
+    def reset(self):
+        """Recount from the replaced read model"""
+        with next(get_db()) as db:
+            self._seed(db)
+            db.commit()
+        self.load()
+    
+    def recent_count(self, hours: int = 24) -> int:
+        """Books created in the last hours, summed over a bounded number of buckets"""
+        since = bucket_start(datetime.utcnow() - timedelta(hours=hours))
+        with self.lock:
+            return sum(count for bucket, count in self.created.items() if bucket >= since)
+    
+    def most_popular_author(self) -> Optional[str]:
+        """Author with the most books"""
+        with self.lock:
+            if self.top_author_stale:
+                self.top_author = max(self.authors, key=self.authors.get) if self.authors else None
+                self.top_author_stale = False
+            return self.top_author
+    
+    def books_by_author(self) -> Dict[str, int]:
+        """Copy of per-author book counts"""
+        with self.lock:
+            return dict(self.authors)
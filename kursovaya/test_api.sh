@@ -150,6 +150,24 @@ echo "Получение списка авторов..."
 status=$(curl -s -o /dev/null -w "%{http_code}" http://localhost:8003/authors)
 check_status $status
 
+# Чтение после своей записи: событие попадает в одну партицию проектора, остальные простаивают
+idle_uuid=$(python3 -c "import uuid; print(str(uuid.uuid4()))")
+echo "Создание книги и чтение с after при простаивающих партициях..."
+position=$(curl -s -X POST "http://localhost:8002/commands/create-book" \
+  -H "Content-Type: application/json" \
+  -d "{
+    \"aggregate_id\": \"$idle_uuid\",
+    \"title\": \"Бесы\",
+    \"description\": \"Роман Федора Достоевского\",
+    \"author\": \"Федор Достоевский\"
+  }" | python3 -c "import sys, json; print(json.load(sys.stdin)['position'])")
+
+for endpoint in "books" "statistics" "authors"; do
+  echo "GET /$endpoint?after=$position..."
+  status=$(curl -s -o /dev/null -w "%{http_code}" "http://localhost:8003/$endpoint?after=$position")
+  check_status $status
+done
+
 echo -e "\n${YELLOW}5. Проверка мониторинга${NC}"
 
 # Проверка Prometheus